@@ -0,0 +1,93 @@
+"""Load test for a locally running recommendation service (service.py).
+
+    python service.py --port 8080 &
+    python -m benchmarks.load_test_service --port 8080 --concurrency 64 --requests 20000
+
+Each client keeps one HTTP/1.1 connection open and sends single-request
+POSTs back to back. Reports throughput, latency percentiles and how many
+requests were rejected with 503 by the service's backpressure.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic_catalog import generate_params
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def _client(host: str, port: int, bodies: List[bytes], latencies: List[float], statuses: Dict[int, int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for body in bodies:
+            request = (
+                f'POST /recommendations HTTP/1.1\r\nHost: {host}\r\n'
+                f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+            ).encode('latin-1') + body
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(host: str, port: int, concurrency: int, total: int, top_k: int) -> Dict[str, object]:
+    params = generate_params(total, seed=42)
+    bodies = [json.dumps({**p, 'top_k': top_k}).encode('utf-8') for p in params]
+    shares = [bodies[i::concurrency] for i in range(concurrency)]
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, share, latencies, statuses) for share in shares if share))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 0.50), 3),
+        'p90_ms': round(_percentile(latencies, 0.90), 3),
+        'p99_ms': round(_percentile(latencies, 0.99), 3),
+        'statuses': statuses
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Load test a local recommendation service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=10_000)
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    summary = asyncio.run(run(args.host, args.port, args.concurrency, args.requests, args.top_k))
+    print(json.dumps(summary, indent=2))
+    return 0 if summary['statuses'].get(200) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
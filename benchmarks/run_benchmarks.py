@@ -0,0 +1,177 @@
+"""Benchmarks for the scoring paths on synthetic catalogs.
+
+    python -m benchmarks.run_benchmarks --sizes 100 10000 1000000
+    python -m benchmarks.run_benchmarks --update-baseline
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json --threshold 0.25
+
+Results are written as JSON. With a baseline, the run exits with status 1 when
+any case is slower (or uses more peak memory) than the baseline by more than
+the threshold.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+import utils.recommendation_engine as engine
+from benchmarks.synthetic_catalog import generate_catalog, generate_params
+from utils.advanced_calculations import get_comprehensive_score, get_comprehensive_scores_batch
+from utils.scoring_engine import CompiledCatalog
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+DEFAULT_BASELINE = BENCHMARK_DIR / 'baseline.json'
+DEFAULT_OUTPUT = BENCHMARK_DIR / 'results.json'
+
+# Scalar per-material functions are timed on a sample; a full loop at 10^6 takes minutes
+SCALAR_SAMPLE = 10_000
+BATCH_PARAMS = 1_000
+TOP_K = 10
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': median(timings), 'min_ms': min(timings)}
+
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak bytes allocated while running fn (NumPy allocations are traced too)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_size(size: int, repeat: int, seed: int) -> Dict[str, Dict[str, float]]:
+    catalog = generate_catalog(size, seed)
+    params = generate_params(1, seed)[0]
+    batch = generate_params(BATCH_PARAMS, seed + 1)
+
+    engine.CATALOG_PATH = None
+    engine.MATERIALS_DATABASE = catalog
+    compiled = engine.get_active_catalog()
+    sample = list(catalog.items())[:SCALAR_SAMPLE]
+
+    cases: Dict[str, Callable[[], Any]] = {
+        'compile_catalog': lambda: CompiledCatalog(catalog),
+        'get_active_catalog': engine.get_active_catalog,
+        f'calculate_material_score[x{len(sample)}]': lambda: [
+            engine.calculate_material_score(entry, params) for _, entry in sample
+        ],
+        f'get_comprehensive_score[x{len(sample)}]': lambda: [
+            get_comprehensive_score(params, {**entry, 'material': name}) for name, entry in sample
+        ],
+        'get_comprehensive_scores_batch': lambda: get_comprehensive_scores_batch([params], compiled),
+        'get_recommendations': lambda: engine.get_recommendations(params, use_answer_table=False),
+        f'get_recommendations[top_k={TOP_K}]': lambda: engine.get_recommendations(
+            params, use_answer_table=False, top_k=TOP_K
+        ),
+        f'get_recommendations[answer_table,top_k={TOP_K}]': lambda: engine.get_recommendations(
+            params, top_k=TOP_K
+        ),
+        f'get_recommendations_batch[{BATCH_PARAMS}x,top_k={TOP_K}]': lambda: engine.get_recommendations_batch(
+            batch, top_k=TOP_K
+        ),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        fn()  # warm-up: compiles the catalog, index and answer table entries on first use
+        result = time_call(fn, repeat)
+        result['peak_bytes'] = peak_memory(fn)
+        if name.startswith('get_recommendations_batch'):
+            result['params_per_s'] = BATCH_PARAMS / (result['median_ms'] / 1000)
+        results[name] = result
+        print(f'{size:>9} {name:<48} {result["median_ms"]:10.3f} ms {result["peak_bytes"] / 1e6:10.2f} MB')
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    memory_threshold: float,
+    min_delta_ms: float
+) -> List[str]:
+    """Cases that are slower or hungrier than the baseline beyond the allowed thresholds."""
+    regressions = []
+    for size, cases in results['results'].items():
+        for name, current in cases.items():
+            previous = baseline.get('results', {}).get(size, {}).get(name)
+            if previous is None:
+                continue
+            slower = current['median_ms'] - previous['median_ms']
+            if slower > min_delta_ms and current['median_ms'] > previous['median_ms'] * (1 + threshold):
+                regressions.append(
+                    f'{name} @ {size}: {current["median_ms"]:.3f} ms vs baseline {previous["median_ms"]:.3f} ms'
+                )
+            if current['peak_bytes'] > previous['peak_bytes'] * (1 + memory_threshold):
+                regressions.append(
+                    f'{name} @ {size}: peak {current["peak_bytes"]} B vs baseline {previous["peak_bytes"]} B'
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the scoring paths on synthetic catalogs.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown against the baseline')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='allowed relative growth of peak memory against the baseline')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='ignore slowdowns smaller than this, which are timer noise')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='write this run as the new baseline instead of comparing against it')
+    args = parser.parse_args(argv)
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform()
+        },
+        'results': {}
+    }
+    for size in args.sizes:
+        results['results'][str(size)] = benchmark_size(size, args.repeat, args.seed)
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f'results written to {args.output}')
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f'baseline updated at {args.baseline}')
+        return 0
+    if not args.baseline.exists():
+        print(f'no baseline at {args.baseline}; run with --update-baseline to create one')
+        return 0
+
+    regressions = find_regressions(
+        results, json.loads(args.baseline.read_text()),
+        args.threshold, args.memory_threshold, args.min_delta_ms
+    )
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import random
+from typing import Any, Dict, List
+
+from data.materials_database import TRAFFIC_LOADS, WEATHER_CONDITIONS, SOIL_TYPES
+from utils.scoring_engine import PROPERTY_FIELDS
+
+ADVANTAGES = [
+    'Good load distribution', 'Smooth riding surface', 'Quick construction', 'Recyclable',
+    'High durability', 'Low maintenance', 'Long service life', 'High load capacity',
+    'Low cost', 'Easy construction', 'Good drainage', 'Simple maintenance',
+    'Water resistant', 'Good skid resistance', 'Cost-effective', 'Aesthetic appeal',
+    'Environmentally friendly', 'Reduced waste', 'Noise reduction', 'Versatile application'
+]
+
+BASE_NAMES = [
+    'Asphalt Concrete', 'Portland Cement Concrete', 'Gravel', 'Bitumen', 'Cobblestone',
+    'Recycled Asphalt', 'Brick', 'Macadam', 'Composite Pavement', 'Rubberized Asphalt'
+]
+
+
+def _condition_choices(values: List[str], allow_all: bool, rng: random.Random, count: int) -> List[List[str]]:
+    """A pool of condition lists to share between materials, as small catalogs repeat them too."""
+    pool = []
+    for _ in range(count):
+        if allow_all and rng.random() < 0.25:
+            pool.append(['all'])
+        else:
+            pool.append(sorted(rng.sample(values, rng.randint(1, min(3, len(values)))), key=values.index))
+    return pool
+
+
+def generate_catalog(size: int, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Synthetic catalog with the same schema as MATERIALS_DATABASE.
+
+    Ratings are integers 1-10 like the real catalog. Condition and advantage lists
+    are drawn from shared pools so that a million materials fit in memory.
+    """
+    rng = random.Random(seed)
+    traffic = _condition_choices(TRAFFIC_LOADS, False, rng, 32)
+    weather = _condition_choices(WEATHER_CONDITIONS, True, rng, 32)
+    soil = _condition_choices(SOIL_TYPES, True, rng, 32)
+    advantages = [rng.sample(ADVANTAGES, 4) for _ in range(64)]
+
+    catalog = {}
+    for i in range(size):
+        name = f'{BASE_NAMES[i % len(BASE_NAMES)]} #{i}'
+        catalog[name] = {
+            'properties': {field: rng.randint(1, 10) for field in PROPERTY_FIELDS},
+            'suitable_conditions': {
+                'traffic_load': rng.choice(traffic),
+                'weather': rng.choice(weather),
+                'soil_type': rng.choice(soil)
+            },
+            'advantages': rng.choice(advantages)
+        }
+    return catalog
+
+
+def generate_params(count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Random parameter sets over the known condition values."""
+    rng = random.Random(seed)
+    return [
+        {
+            'location': f'site-{i}',
+            'traffic_load': rng.choice(TRAFFIC_LOADS),
+            'weather': rng.choice(WEATHER_CONDITIONS),
+            'soil_type': rng.choice(SOIL_TYPES)
+        }
+        for i in range(count)
+    ]
@@ -1,22 +1,81 @@
 
+import json
+import os
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
-import base64
 from pathlib import Path
 
 from data.materials_database import WEATHER_CONDITIONS, TRAFFIC_LOADS, SOIL_TYPES
-from utils.recommendation_engine import get_recommendations
+from utils import instrumentation, startup_profile
 
-# Function to convert an image to a base64 string
-def get_image_base64(filepath: str):
-    """Encodes an image file to a base64 string for embedding in HTML."""
-    mime_type = filepath.split('.')[-1].lower()
-    with open(filepath, "rb") as f:
-        content_bytes = f.read()
-        content_b64encoded = base64.b64encode(content_bytes).decode()
-    return f"data:image/{mime_type};base64,{content_b64encoded}"
+# Plotting, pandas and the recommendation engine (NumPy) are imported only once
+# recommendations are requested, so the form renders without paying for them.
+
+startup_profile.begin_run()
+
+# Choices for how many ranked materials the comparison lists
+COMPARISON_SIZES = [10, 100, 1_000, 10_000]
+
+# Comparisons up to this many rows render as a static table; longer ones as a paged dataframe
+STATIC_TABLE_ROWS = 25
+TABLE_PAGE_SIZE = 100
+
+# Materials drawn in the grouped bar chart; longer rankings add a WebGL chart of all scores
+CHART_TOP_N = 25
+
+# Best-ranked materials compared in the lifecycle cost view
+LIFECYCLE_TOP_K = 10
+
+# Least-dominated materials listed in the Pareto view
+PARETO_TOP_K = 50
+
+# Column and label of the ranking score for each scoring mode
+SCORE_LABELS = {"suitability": "Suitability Score", "comprehensive": "Comprehensive Score"}
+
+# Traffic-growth and weather scenarios simulated for the lifecycle cost view
+LIFECYCLE_SCENARIOS = 1000
+
+# Files in ./static are served by Streamlit at app/static/ (server.enableStaticServing)
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Timing spans (utils/instrumentation) are exported here after each recommendation run
+METRICS_DIR = Path(__file__).parent / "metrics"
+
+@st.cache_resource
+def get_result_cache():
+    """Ranked results and figure JSON shared by every session in the process."""
+    from utils.result_cache import DEFAULT_MAX_BYTES, DEFAULT_MAX_DISK_BYTES, ResultCache
+    max_bytes = int(float(os.environ.get("RESULT_CACHE_MB", 0)) * 1024 * 1024) or DEFAULT_MAX_BYTES
+    max_disk_bytes = int(float(os.environ.get("RESULT_CACHE_DISK_MB", 0)) * 1024 * 1024) or DEFAULT_MAX_DISK_BYTES
+    return ResultCache(max_bytes, os.environ.get("RESULT_CACHE_PATH"), max_disk_bytes)
+
+@st.cache_resource
+def start_metrics_server(port: int):
+    """Starts the local /metrics endpoint once per process."""
+    return instrumentation.serve(port)
+
+@st.cache_resource
+def load_css(filepath: str) -> str:
+    """Reads a stylesheet once per process."""
+    return Path(filepath).read_text()
+
+@st.cache_resource
+def static_url(filename: str) -> str:
+    """URL of a file served from the static directory."""
+    if not (STATIC_DIR / filename).is_file():
+        raise FileNotFoundError(f"Static asset not found: {STATIC_DIR / filename}")
+    return f"app/static/{filename}"
+
+def fill_conditions_from_location():
+    """Selects the weather and soil of the entered location's reference site, when one is known."""
+    from utils.location_lookup import resolve_location
+    match = resolve_location(st.session_state.location) if st.session_state.location.strip() else None
+    st.session_state.location_match = match
+    if match:
+        st.session_state.weather = match['weather']
+        st.session_state.soil_type = match['soil_type']
+
+if instrumentation.is_enabled() and os.environ.get("RECOMMENDER_METRICS_PORT"):
+    start_metrics_server(int(os.environ["RECOMMENDER_METRICS_PORT"]))
 
 # Page configuration
 st.set_page_config(
@@ -27,17 +86,13 @@ st.set_page_config(
 )
 
 # Load custom CSS
-with open('styles/custom.css') as f:
-    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
+st.markdown(f'<style>{load_css("styles/custom.css")}</style>', unsafe_allow_html=True)
 
-# Get base64 image string
-image_base64 = get_image_base64("styles/background-img.jpg")  # Change path to your image
-
-# Header with custom styling and embedded image
+# Header with custom styling; the image is served as a static file instead of being inlined
 st.markdown(f"""
     <div class='title-section'>
         <div class='title-content' style="text-align: center;">
-            <img src="{image_base64}" alt="Road Construction" style="width: 100%; border-radius: 10px; margin-top: 10px;">
+            <img src="{static_url('background-img.jpg')}" alt="Road Construction" style="width: 100%; border-radius: 10px; margin-top: 10px;">
             <h1 style='font-size: 2.5em; margin-bottom: 1rem;'>🛣️ Road Construction Material Recommender</h1>
             <p style='font-size: 1.2em; color: #999;'>
                 Material recommendations for modern road construction projects
@@ -52,7 +107,19 @@ st.header("Project Parameters")
 
 col1, col2 = st.columns(2)
 with col1:
-    location = st.text_input("Project Location", "", help="Enter the construction site location")
+    location = st.text_input(
+        "Project Location",
+        "",
+        key="location",
+        on_change=fill_conditions_from_location,
+        help="Enter the construction site location as a place name or as latitude, longitude"
+    )
+    if st.session_state.get("location_match"):
+        match = st.session_state.location_match
+        distance = "" if not match['distance_km'] else f", {match['distance_km']:.0f} km away"
+        st.caption(f"Weather and soil set from reference data for {match['site']}{distance}.")
+    elif location.strip() and "location_match" in st.session_state:
+        st.caption("No reference data near this location; choose the weather and soil below.")
     traffic_load = st.selectbox(
         "Traffic Load",
         options=TRAFFIC_LOADS,
@@ -63,117 +130,530 @@ with col2:
     weather = st.selectbox(
         "Weather Conditions",
         options=WEATHER_CONDITIONS,
+        key="weather",
         help="Predominant weather conditions in the area"
     )
     soil_type = st.selectbox(
         "Soil Type",
         options=SOIL_TYPES,
+        key="soil_type",
         help="Type of soil at the construction site"
     )
 
+scoring = st.radio(
+    "Ranking Model",
+    options=['suitability', 'comprehensive'],
+    format_func=lambda mode: {'suitability': 'Condition suitability', 'comprehensive': 'Comprehensive (load, cost, environment, weather)'}[mode],
+    horizontal=True,
+    help="Score used to rank the materials"
+)
+
+comparison_size = st.select_slider(
+    "Materials to compare",
+    options=COMPARISON_SIZES,
+    format_func=lambda size: f"{size:,}",
+    help="How many of the best-ranked materials the comparison table lists"
+)
+
+col1, col2 = st.columns(2)
+with col1:
+    run_sensitivity = st.checkbox(
+        "Weight sensitivity analysis",
+        help="Re-rank the catalog under randomly perturbed weights to see how stable the recommendation is"
+    )
+with col2:
+    sensitivity_samples = st.select_slider(
+        "Weight samples",
+        options=[100_000, 250_000, 500_000, 1_000_000],
+        format_func=lambda samples: f"{samples:,}",
+        disabled=not run_sensitivity
+    )
+
 st.markdown("</div>", unsafe_allow_html=True)
 
-# Generate recommendations when form is submitted
+startup_profile.mark("form rendered")
+if startup_profile.ENABLED:
+    with st.sidebar.expander("Startup profile", expanded=True):
+        st.table(startup_profile.report())
+        if startup_profile.over_budget("form rendered"):
+            st.warning(f"First render exceeded the {startup_profile.BUDGET_MS:.0f} ms budget")
+
+# Generate recommendations when form is submitted. The submission is kept in the session,
+# so paging through results reruns the script without recomputing them.
 if st.button("Generate Recommendations", key="generate_btn"):
     if not location:
         st.error("Please enter a project location")
+        st.session_state.pop("submission", None)
     else:
-        with st.spinner('Analyzing parameters and generating recommendations...'):
-            params = {
+        st.session_state.submission = {
+            'params': {
                 'location': location,
                 'traffic_load': traffic_load,
                 'weather': weather,
                 'soil_type': soil_type
+            },
+            'scoring': scoring,
+            'comparison_size': comparison_size,
+            'run_sensitivity': run_sensitivity,
+            'sensitivity_samples': sensitivity_samples
+        }
+        st.session_state.comparison_page = 1
+
+submission = st.session_state.get("submission")
+if submission:
+    with st.spinner('Analyzing parameters and generating recommendations...'):
+        with startup_profile.timed_import('utils.recommendation_engine'):
+            from utils.recommendation_engine import (
+                WEIGHT_FACTORS, get_active_catalog, get_incremental_scorer, get_recommendations
+            )
+            from utils.result_cache import cache_key
+        with startup_profile.timed_import('plotly, pandas'):
+            import plotly.graph_objects as go
+            import plotly.express as px
+            import pandas as pd
+
+        params = submission['params']
+        result_scoring = submission['scoring']
+        score_label = SCORE_LABELS[result_scoring]
+        comparison_size = submission['comparison_size']
+
+        # Results and figures are shared across sessions: a repeated query skips scoring and
+        # figure construction and renders the cached figure JSON directly
+        catalog = get_active_catalog()
+        result_cache = get_result_cache()
+        ranked_key = cache_key(
+            params, catalog, WEIGHT_FACTORS, view='ranked', scoring=result_scoring, top_k=comparison_size,
+            score_label=score_label
+        )
+        ranked = result_cache.get(ranked_key)
+        if ranked is None:
+            # Known values are answered from the answer table; for others the scorer, kept per
+            # session, re-matches only the field changed by a single select box change
+            st.session_state.scorer = get_incremental_scorer(st.session_state.get('scorer'), catalog)
+            recommendations = get_recommendations(
+                params, top_k=comparison_size, scoring=result_scoring, scorer=st.session_state.scorer
+            )
+            top_recommendation = recommendations[0]
+            properties = top_recommendation['properties']
+
+            # Radar chart with material properties
+            with instrumentation.span("figure.radar"):
+                fig = go.Figure()
+                fig.add_trace(go.Scatterpolar(
+                    r=list(properties.values()),
+                    theta=list(properties.keys()),
+                    fill='toself',
+                    name=top_recommendation['material'],
+                    line_color='#1E88E5'
+                ))
+                fig.update_layout(
+                    polar=dict(
+                        radialaxis=dict(
+                            visible=True,
+                            range=[0, 10],
+                            gridcolor="rgba(255, 255, 255, 0.1)",
+                            color="white"
+                        ),
+                        bgcolor="rgba(0,0,0,0)"
+                    ),
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    font_color="white",
+                    showlegend=True,
+                    height=600
+                )
+                radar_figure = json.loads(fig.to_json())
+
+            with instrumentation.span("dataframe.comparison"):
+                # Columns come straight from the catalog's property records for the ranked rows
+                records = catalog.property_records([rec.index for rec in recommendations])
+                df = pd.DataFrame({
+                    'Material': [rec['material'] for rec in recommendations],
+                    score_label: [float(rec.score) for rec in recommendations],
+                    'Durability': records['durability'],
+                    'Cost Factor': records['cost'],
+                    'Weather Resistance': records['weather_resistance'],
+                    'Load Capacity': records['load_capacity']
+                })
+
+            # Bar chart comparison; long rankings show their top CHART_TOP_N here and every
+            # material in a WebGL score chart below, instead of thousands of bar groups
+            with instrumentation.span("figure.bar"):
+                fig = px.bar(
+                    df.head(CHART_TOP_N),
+                    x='Material',
+                    y=['Durability', 'Cost Factor', 'Weather Resistance', 'Load Capacity'],
+                    title="Material Properties Comparison" if len(df) <= CHART_TOP_N else f"Material Properties Comparison (top {CHART_TOP_N} of {len(df):,})",
+                    barmode='group',
+                    template="plotly_dark",
+                    height=600
+                )
+                fig.update_layout(
+                    xaxis_title="Material",
+                    yaxis_title="Rating (0-10)",
+                    legend_title="Properties",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    font_color="white",
+                    showlegend=True,
+                    margin=dict(l=50, r=50, t=50, b=50)
+                )
+                bar_figure = json.loads(fig.to_json())
+
+            score_figure = None
+            if len(df) > CHART_TOP_N:
+                with instrumentation.span("figure.scores"):
+                    fig = go.Figure(go.Scattergl(
+                        x=list(range(1, len(df) + 1)),
+                        y=df[score_label],
+                        text=df['Material'],
+                        mode='markers',
+                        marker=dict(size=4, color='#1E88E5'),
+                        hovertemplate="#%{x}: %{text}<br>Score %{y:.1f}%<extra></extra>"
+                    ))
+                    fig.update_layout(
+                        title=f"Scores of all {len(df):,} ranked materials",
+                        xaxis_title="Rank",
+                        yaxis_title=f"{score_label} (%)",
+                        template="plotly_dark",
+                        plot_bgcolor="rgba(0,0,0,0)",
+                        paper_bgcolor="rgba(0,0,0,0)",
+                        font_color="white",
+                        height=400
+                    )
+                    score_figure = json.loads(fig.to_json())
+
+            ranked = {
+                'rows': [int(rec.index) for rec in recommendations],
+                'best': {
+                    'material': top_recommendation['material'],
+                    'score': float(top_recommendation['score']),
+                    'advantages': list(top_recommendation['advantages'])
+                },
+                'comparison': df.to_dict(orient='list'),
+                'radar': radar_figure,
+                'bar': bar_figure,
+                'scores': score_figure
             }
+            result_cache.put(ranked_key, ranked)
 
-            recommendations = get_recommendations(params)
+        # Display recommendations
+        st.header("Recommended Materials")
 
-            # Display recommendations
-            st.header("Recommended Materials")
+        ranked_tab, pareto_tab, lifecycle_tab = st.tabs(["Ranked List", "Pareto Front", "Lifecycle Cost"])
 
+        with ranked_tab:
             # Top recommendation
             with st.container():
                 st.markdown("""<div style='background: rgba(31, 31, 31, 0.7); padding: 2rem; border-radius: 8px; margin-bottom: 2rem;'>""", unsafe_allow_html=True)
 
                 st.subheader("Best Match")
-                top_recommendation = recommendations[0]
+                top_recommendation = ranked['best']
 
                 col1, col2 = st.columns(2)
                 with col1:
                     st.markdown(f"### {top_recommendation['material']}")
-                    st.markdown(f"**Suitability Score:** {top_recommendation['score']:.1f}%")
+                    st.markdown(f"**{score_label}:** {top_recommendation['score']:.1f}%")
                     st.markdown("### Key Advantages")
                     for advantage in top_recommendation['advantages']:
                         st.markdown(f"✓ {advantage}")
 
                 with col2:
-                    # Radar chart with material properties
-                    properties = top_recommendation['properties']
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatterpolar(
-                        r=list(properties.values()),
-                        theta=list(properties.keys()),
-                        fill='toself',
-                        name=top_recommendation['material'],
-                        line_color='#1E88E5'
-                    ))
-                    fig.update_layout(
-                        polar=dict(
-                            radialaxis=dict(
-                                visible=True,
-                                range=[0, 10],
-                                gridcolor="rgba(255, 255, 255, 0.1)",
-                                color="white"
-                            ),
-                            bgcolor="rgba(0,0,0,0)"
-                        ),
-                        paper_bgcolor="rgba(0,0,0,0)",
-                        plot_bgcolor="rgba(0,0,0,0)",
-                        font_color="white",
-                        showlegend=True,
-                        height=600
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                    with instrumentation.span("render.radar"):
+                        st.plotly_chart(ranked['radar'], use_container_width=True)
 
                 st.markdown("</div>", unsafe_allow_html=True)
 
             # Comparison table
             st.subheader("Material Comparison")
-            comparison_data = []
-            for rec in recommendations:
-                comparison_data.append({
-                    'Material': rec['material'],
-                    'Suitability Score': f"{rec['score']:.1f}%",
-                    'Durability': rec['properties']['durability'],
-                    'Cost Factor': rec['properties']['cost'],
-                    'Weather Resistance': rec['properties']['weather_resistance'],
-                    'Load Capacity': rec['properties']['load_capacity']
-                })
+            comparison = ranked['comparison']
+            rows = len(comparison['Material'])
+            with instrumentation.span("render.table"):
+                if rows <= STATIC_TABLE_ROWS:
+                    st.table(pd.DataFrame(comparison).assign(**{
+                        score_label: [f"{score:.1f}%" for score in comparison[score_label]]
+                    }))
+                else:
+                    # Only the current page is sent to the browser
+                    pages = (rows + TABLE_PAGE_SIZE - 1) // TABLE_PAGE_SIZE
+                    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, key="comparison_page")
+                    start = (page - 1) * TABLE_PAGE_SIZE
+                    stop = min(rows, start + TABLE_PAGE_SIZE)
+                    page_df = pd.DataFrame(
+                        {column: values[start:stop] for column, values in comparison.items()},
+                        index=pd.RangeIndex(start + 1, stop + 1, name="Rank")
+                    )
+                    st.dataframe(
+                        page_df,
+                        use_container_width=True,
+                        column_config={score_label: st.column_config.NumberColumn(format="%.1f%%")}
+                    )
+                    st.caption(f"Materials {start + 1:,}–{stop:,} of {rows:,}")
+
+            with instrumentation.span("render.bar"):
+                st.plotly_chart(ranked['bar'], use_container_width=True)
+            if ranked['scores']:
+                with instrumentation.span("render.scores"):
+                    st.plotly_chart(ranked['scores'], use_container_width=True)
 
-            df = pd.DataFrame(comparison_data)
-            st.table(df)
-
-            # Bar chart comparison
-            fig = px.bar(
-                df,
-                x='Material',
-                y=['Durability', 'Cost Factor', 'Weather Resistance', 'Load Capacity'],
-                title="Material Properties Comparison",
-                barmode='group',
-                template="plotly_dark",
-                height=600
+            if submission['run_sensitivity']:
+                from utils.sensitivity import weight_sensitivity
+
+                st.subheader("Weight Sensitivity")
+                # Sampled once per submission, not again when the page is changed
+                sensitivity_request = (params, result_scoring, submission['sensitivity_samples'])
+                if st.session_state.get("sensitivity_request") != sensitivity_request:
+                    with instrumentation.span("sensitivity"):
+                        st.session_state.sensitivity = weight_sensitivity(
+                            params, scoring=result_scoring, samples=submission['sensitivity_samples']
+                        )
+                    st.session_state.sensitivity_request = sensitivity_request
+                sensitivity = st.session_state.sensitivity
+                st.caption(
+                    f"{sensitivity['samples']:,} weight vectors drawn from a Dirichlet distribution around the default "
+                    f"weights ({', '.join(sensitivity['weights'])}). Rank intervals cover 90% of the samples."
+                )
+                sensitivity_df = pd.DataFrame([
+                    {
+                        'Material': row['material'],
+                        'Default Rank': row['default_rank'],
+                        'P(Rank 1)': f"{row['p_first']:.1%}",
+                        '95% CI': f"{row['p_first_low']:.1%} – {row['p_first_high']:.1%}",
+                        'Mean Rank': '' if row['mean_rank'] is None else f"{row['mean_rank']:.2f}",
+                        'Rank Interval': '' if row['rank_p05'] is None else f"{row['rank_p05']} – {row['rank_p95']}"
+                    }
+                    for row in sensitivity['materials']
+                ])
+                st.table(sensitivity_df)
+
+        with pareto_tab:
+            from utils.pareto import pareto_front
+            from utils.scoring_engine import CONDITION_FIELDS
+
+            pareto_key = cache_key(params, catalog, WEIGHT_FACTORS, view='pareto', top_k=PARETO_TOP_K)
+            pareto = result_cache.get(pareto_key)
+            if pareto is None:
+                with instrumentation.span("pareto"):
+                    front = pareto_front(params, catalog=catalog)
+                pareto = {'candidates': len(front), 'front': len(front.front), 'conditions_met': front.conditions_met}
+                if len(front):
+                    pareto_df = front.to_frame(limit=PARETO_TOP_K).rename(columns={
+                        'material': 'Material',
+                        'durability': 'Durability',
+                        'cost': 'Cost Factor',
+                        'weather_resistance': 'Weather Resistance',
+                        'load_capacity': 'Load Capacity',
+                        'maintenance': 'Maintenance',
+                        'dominated_by': 'Dominated By',
+                        'pareto_optimal': 'Pareto Optimal'
+                    })
+                    with instrumentation.span("figure.pareto"):
+                        fig = px.scatter(
+                            pareto_df,
+                            x='Cost Factor',
+                            y='Durability',
+                            size='Load Capacity',
+                            color='Pareto Optimal',
+                            hover_name='Material',
+                            hover_data=['Weather Resistance', 'Maintenance', 'Dominated By'],
+                            title="Cost vs. Durability",
+                            template="plotly_dark",
+                            height=500
+                        )
+                        fig.update_layout(
+                            plot_bgcolor="rgba(0,0,0,0)",
+                            paper_bgcolor="rgba(0,0,0,0)",
+                            font_color="white"
+                        )
+                        pareto['figure'] = json.loads(fig.to_json())
+                    pareto['table'] = pareto_df.to_dict(orient='list')
+                result_cache.put(pareto_key, pareto)
+
+            if not pareto['candidates']:
+                st.info("The catalog is empty.")
+            else:
+                if pareto['conditions_met'] < len(CONDITION_FIELDS):
+                    st.info(
+                        f"No material satisfies all conditions; comparing the materials that satisfy "
+                        f"{pareto['conditions_met']} of {len(CONDITION_FIELDS)}."
+                    )
+                st.caption(
+                    f"{pareto['front']:,} of {pareto['candidates']:,} candidate materials are not dominated: "
+                    "no other candidate is at least as durable, weather resistant and load bearing while costing "
+                    "and needing maintenance no more, and strictly better in one of these."
+                )
+                st.dataframe(pd.DataFrame(pareto['table']), hide_index=True, use_container_width=True)
+                with instrumentation.span("render.pareto"):
+                    st.plotly_chart(pareto['figure'], use_container_width=True)
+
+        with lifecycle_tab:
+            from utils.lifecycle import YEARS, generate_scenarios, simulate_lifecycle
+
+            lifecycle_key = cache_key(
+                params, catalog, WEIGHT_FACTORS, view='lifecycle', scoring=result_scoring, top_k=LIFECYCLE_TOP_K,
+                scenarios=LIFECYCLE_SCENARIOS
+            )
+            lifecycle_results = result_cache.get(lifecycle_key)
+            if lifecycle_results is None:
+                with instrumentation.span("lifecycle"):
+                    lifecycle = simulate_lifecycle(
+                        [{'traffic_load': params['traffic_load'], 'weather': params['weather'], 'length_km': 1.0}],
+                        generate_scenarios(LIFECYCLE_SCENARIOS, seed=0),
+                        materials=ranked['rows'][:LIFECYCLE_TOP_K],
+                        catalog=catalog
+                    )
+                with instrumentation.span("figure.lifecycle"):
+                    curves = lifecycle.network_npc_curves.mean(axis=1)
+                    lifecycle_df = pd.DataFrame({
+                        'Year': list(range(curves.shape[1])) * len(lifecycle.materials),
+                        'Material': [catalog.names[index] for index in lifecycle.materials for _ in range(curves.shape[1])],
+                        'Net Present Cost': curves.ravel()
+                    })
+                    fig = px.line(
+                        lifecycle_df,
+                        x='Year',
+                        y='Net Present Cost',
+                        color='Material',
+                        title="Cumulative Net Present Cost (scenario mean)",
+                        template="plotly_dark",
+                        height=500
+                    )
+                    fig.update_layout(
+                        plot_bgcolor="rgba(0,0,0,0)",
+                        paper_bgcolor="rgba(0,0,0,0)",
+                        font_color="white"
+                    )
+                lifecycle_results = {'summary': lifecycle.summary(), 'figure': json.loads(fig.to_json())}
+                result_cache.put(lifecycle_key, lifecycle_results)
+
+            st.caption(
+                f"Net present cost of 1 km over {YEARS} years across {LIFECYCLE_SCENARIOS:,} scenarios of "
+                "traffic growth and weather-year variation, including resurfacing."
             )
-            fig.update_layout(
-                xaxis_title="Material",
-                yaxis_title="Rating (0-10)",
-                legend_title="Properties",
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font_color="white",
-                showlegend=True,
-                margin=dict(l=50, r=50, t=50, b=50)
+            st.table(pd.DataFrame([
+                {
+                    'Material': row['material'],
+                    'Mean NPC': f"{row['mean_npc']:,.0f}",
+                    'P10 – P90': f"{row['p10_npc']:,.0f} – {row['p90_npc']:,.0f}",
+                    'Resurfacings': f"{row['mean_resurfacings']:.1f}"
+                }
+                for row in lifecycle_results['summary']
+            ]))
+            with instrumentation.span("render.lifecycle"):
+                st.plotly_chart(lifecycle_results['figure'], use_container_width=True)
+
+        if instrumentation.is_enabled():
+            with st.sidebar.expander("Result cache"):
+                st.json(result_cache.stats())
+
+    if instrumentation.is_enabled():
+        instrumentation.export(str(METRICS_DIR))
+
+# Corridor mode: one recommendation per stretch of a route instead of per parameter set
+with st.expander("Corridor Mode"):
+    st.caption(
+        "Recommend materials along a route whose traffic, weather and soil change. "
+        "Adjacent segments with the same recommendation are merged into sections."
+    )
+    corridor_file = st.file_uploader(
+        "Corridor segments (CSV)",
+        type="csv",
+        help="Columns traffic_load, weather and soil_type, plus start_km and end_km or length_km, in route order"
+    )
+    corridor_route = st.text_area(
+        "Or route vertices",
+        placeholder="23.2599, 77.4126\n22.7196, 75.8577",
+        help="One latitude, longitude per line. Weather and soil are looked up every km; traffic load comes from the form"
+    )
+    corridor_budget = st.number_input(
+        "Construction budget",
+        min_value=0.0,
+        value=0.0,
+        step=1000.0,
+        help="Cap on total construction cost (cost rating × 10 per km). With a budget the materials are chosen for "
+             "the whole corridor to maximize the length-weighted score; 0 picks the best material for every segment"
+    )
+    if st.button("Plan Corridor", key="corridor_btn"):
+        from utils.corridor import parse_route, plan_corridor, segments_from_route
+        import plotly.express as px
+        import pandas as pd
+
+        try:
+            if corridor_file is not None:
+                import csv
+                import io
+                rows = csv.DictReader(io.StringIO(corridor_file.getvalue().decode("utf-8")))
+            elif corridor_route.strip():
+                rows = segments_from_route(
+                    parse_route(corridor_route), traffic_load, {'weather': weather, 'soil_type': soil_type}
+                )
+            else:
+                raise ValueError("Upload a segments CSV or enter route vertices")
+            with instrumentation.span("corridor"):
+                plan = plan_corridor(rows, scoring=scoring, budget=corridor_budget or None)
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            sections = plan['sections']
+            st.caption(
+                f"{plan['segments']:,} segments over {plan['length_km']:,.1f} km, "
+                f"{plan['distinct_conditions']:,} distinct condition sets scored, "
+                f"{len(sections):,} {'section' if len(sections) == 1 else 'sections'}."
             )
-            st.plotly_chart(fig, use_container_width=True)
+            if 'network' in plan:
+                network = plan['network']
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Construction Cost", f"{network.total_cost:,.0f}", f"{network.total_cost - network.budget:,.0f} vs. budget", delta_color="inverse")
+                col2.metric("Mean Score", f"{network.mean_score:.1f}%")
+                col3.metric("Optimality Gap", f"{network.gap:.2%}", help="Distance from an upper bound on the best total score within the budget")
+            corridor_df = pd.DataFrame({
+                'From (km)': [section['start_km'] for section in sections],
+                'To (km)': [section['end_km'] for section in sections],
+                'Length (km)': [section['length_km'] for section in sections],
+                'Material': [section['material'] for section in sections],
+                'Mean Score': [section['mean_score'] for section in sections],
+                'Min Score': [section['min_score'] for section in sections],
+                'Segments': [section['segments'] for section in sections],
+                'Traffic Load': [" / ".join(section['traffic_load']) for section in sections],
+                'Weather': [" / ".join(section['weather']) for section in sections],
+                'Soil Type': [" / ".join(section['soil_type']) for section in sections]
+            })
+            st.dataframe(
+                corridor_df,
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    'From (km)': st.column_config.NumberColumn(format="%.1f"),
+                    'To (km)': st.column_config.NumberColumn(format="%.1f"),
+                    'Length (km)': st.column_config.NumberColumn(format="%.1f"),
+                    'Mean Score': st.column_config.NumberColumn(format="%.1f%%"),
+                    'Min Score': st.column_config.NumberColumn(format="%.1f%%")
+                }
+            )
+
+            # Strip chart: one horizontal bar per section, placed at its chainage
+            with instrumentation.span("figure.corridor"):
+                fig = px.bar(
+                    corridor_df.assign(Route="Route"),
+                    x='Length (km)',
+                    y='Route',
+                    base='From (km)',
+                    color='Material',
+                    orientation='h',
+                    hover_data=['From (km)', 'To (km)', 'Mean Score', 'Weather', 'Soil Type'],
+                    title="Recommended Material by Chainage",
+                    template="plotly_dark",
+                    height=250
+                )
+                fig.update_layout(
+                    xaxis_title="Chainage (km)",
+                    yaxis_title=None,
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    font_color="white"
+                )
+            with instrumentation.span("render.corridor"):
+                st.plotly_chart(fig, use_container_width=True)
 
 # Footer
 st.markdown("---")
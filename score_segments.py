@@ -0,0 +1,209 @@
+"""Score a road-segment file against the materials catalog.
+
+Rows are streamed in chunks, scored in a process pool with
+get_recommendations_batch, and written in input order, so memory stays flat
+however large the input is. Progress is checkpointed next to the output after
+every chunk; --resume continues an interrupted run from the last checkpoint.
+
+    python score_segments.py segments.csv scored.csv --top-k 3 --workers 4
+    python score_segments.py segments.parquet scored.csv --resume
+
+Input needs an id column plus traffic_load, weather and soil_type. Parquet
+input requires pyarrow. The output is CSV with the best material, its score
+and the next top_k - 1 alternatives.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from utils.recommendation_engine import get_active_catalog, get_recommendations_batch
+from utils.scoring_engine import CONDITION_FIELDS
+
+DEFAULT_CHUNK_SIZE = 50_000
+PROGRESS_INTERVAL = 5.0
+
+
+def _iter_rows(path: str, columns: List[str], chunk_size: int) -> Iterator[Dict[str, str]]:
+    if path.lower().endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit('Reading Parquet input requires pyarrow (pip install pyarrow)')
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield from batch.to_pylist()
+        return
+
+    with open(path, newline='') as handle:
+        reader = csv.DictReader(handle)
+        missing = [column for column in columns if column not in (reader.fieldnames or [])]
+        if missing:
+            raise SystemExit(f'{path} is missing columns: {", ".join(missing)}')
+        yield from reader
+
+
+def read_chunks(path: str, columns: List[str], chunk_size: int, skip_rows: int = 0) -> Iterator[List[Dict[str, str]]]:
+    """Yield lists of row dicts, reading only one chunk at a time."""
+    rows = _iter_rows(path, columns, chunk_size)
+    for _ in zip(range(skip_rows), rows):
+        pass
+
+    chunk: List[Dict[str, str]] = []
+    for row in rows:
+        chunk.append({column: row[column] for column in columns})
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def output_header(top_k: int) -> List[str]:
+    header = ['id', 'best_material', 'best_score']
+    for rank in range(2, top_k + 1):
+        header += [f'material_{rank}', f'score_{rank}']
+    return header
+
+
+def score_chunk(rows: List[Dict[str, str]], id_column: str, top_k: int) -> str:
+    """Score one chunk and return it as CSV text; runs in a worker process."""
+    params_list = [{field: str(row[field]) for field in CONDITION_FIELDS} for row in rows]
+    result = get_recommendations_batch(params_list, top_k=top_k)
+    materials = result.materials
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row, ranking, scores in zip(rows, result.ranking, result.scores):
+        record = [row[id_column]]
+        for index, score in zip(ranking, scores):
+            record += [materials[index], f'{score:.2f}']
+        writer.writerow(record)
+    return buffer.getvalue()
+
+
+def _warm_worker() -> None:
+    get_active_catalog()
+
+
+class Checkpoint:
+    """Rows done and output size after the last fully written chunk."""
+
+    def __init__(self, output_path: str):
+        self.path = output_path + '.progress'
+
+    def load(self) -> Optional[Dict[str, int]]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, rows_done: int, output_bytes: int, top_k: int) -> None:
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'rows_done': rows_done, 'output_bytes': output_bytes, 'top_k': top_k}, f)
+        os.replace(temp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run(args: argparse.Namespace) -> Dict[str, float]:
+    columns = [args.id_column] + list(CONDITION_FIELDS)
+    checkpoint = Checkpoint(args.output)
+
+    rows_done = 0
+    state = checkpoint.load() if args.resume else None
+    if state:
+        if state['top_k'] != args.top_k:
+            raise SystemExit(f"checkpoint was written with --top-k {state['top_k']}")
+        rows_done = state['rows_done']
+        output = open(args.output, 'r+', newline='', encoding='utf-8')
+        output.truncate(state['output_bytes'])  # drop any chunk written after the last checkpoint
+        output.seek(state['output_bytes'])
+    else:
+        output = open(args.output, 'w', newline='', encoding='utf-8')
+        csv.writer(output).writerow(output_header(args.top_k))
+        output.flush()
+        checkpoint.save(0, output.tell(), args.top_k)
+
+    resumed_from = rows_done
+    started = last_report = time.perf_counter()
+    chunks = read_chunks(args.input, columns, args.chunk_size, skip_rows=rows_done)
+
+    def write(text: str, size: int) -> None:
+        nonlocal rows_done, last_report
+        output.write(text)
+        output.flush()
+        os.fsync(output.fileno())
+        rows_done += size
+        checkpoint.save(rows_done, output.tell(), args.top_k)
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            rate = (rows_done - resumed_from) / (now - started)
+            print(f'{rows_done:,} rows scored ({rate:,.0f} rows/s)', file=sys.stderr, flush=True)
+
+    try:
+        if args.workers == 0:
+            _warm_worker()
+            for chunk in chunks:
+                write(score_chunk(chunk, args.id_column, args.top_k), len(chunk))
+        else:
+            # Bounded in-flight window: memory holds at most this many chunks at once
+            max_in_flight = args.workers * 2
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=_warm_worker) as pool:
+                pending: deque = deque()
+                for chunk in chunks:
+                    pending.append((pool.submit(score_chunk, chunk, args.id_column, args.top_k), len(chunk)))
+                    if len(pending) >= max_in_flight:
+                        future, size = pending.popleft()
+                        write(future.result(), size)
+                while pending:
+                    future, size = pending.popleft()
+                    write(future.result(), size)
+    finally:
+        output.close()
+
+    checkpoint.clear()
+    elapsed = time.perf_counter() - started
+    scored = rows_done - resumed_from
+    return {
+        'rows_scored': scored,
+        'rows_total': rows_done,
+        'seconds': elapsed,
+        'rows_per_s': scored / elapsed if elapsed else 0.0
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Score road segments from a CSV or Parquet file.')
+    parser.add_argument('input', help='CSV or Parquet file with road segments')
+    parser.add_argument('output', help='CSV file for the scored segments')
+    parser.add_argument('--id-column', default='id')
+    parser.add_argument('--top-k', type=int, default=3, help='best material plus top_k - 1 alternatives')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes; 0 scores in this process')
+    parser.add_argument('--resume', action='store_true', help='continue from the last checkpoint')
+    args = parser.parse_args(argv)
+    if args.top_k < 1:
+        parser.error('--top-k must be at least 1')
+
+    summary = run(args)
+    print(
+        f"Scored {summary['rows_scored']:,} rows ({summary['rows_total']:,} total) "
+        f"in {summary['seconds']:.1f}s, {summary['rows_per_s']:,.0f} rows/s",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""Headless HTTP JSON service for material recommendations.
+
+Runs without Streamlit. Concurrent single requests are held for a few
+milliseconds and scored together with get_recommendations_batch; bulk
+requests are scored as one batch directly.
+
+    python service.py --port 8080
+
+    POST /recommendations        {"traffic_load": "high", "weather": "hot", "soil_type": "rocky", "top_k": 5}
+    POST /recommendations/bulk   {"params": [{...}, ...], "top_k": 3}
+    GET  /health
+"""
+import argparse
+import asyncio
+import json
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.recommendation_engine import SCORING_MODES, get_active_catalog, get_recommendations_batch
+from utils.scoring_engine import CONDITION_FIELDS
+
+DEFAULT_BATCH_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH_SIZE = 512
+DEFAULT_MAX_PENDING = 4096
+DEFAULT_MAX_BULK_SIZE = 100_000
+DEFAULT_MAX_BODY_BYTES = 16 * 1024 * 1024
+DEFAULT_TOP_K = 10
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'
+}
+
+
+class RequestError(Exception):
+    """Client error reported with an HTTP status."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _parse_options(body: Dict[str, Any]) -> Tuple[Optional[int], str]:
+    top_k = body.get('top_k', DEFAULT_TOP_K)
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k < 0):
+        raise RequestError(400, "'top_k' must be a non-negative integer or null")
+    scoring = body.get('scoring', 'suitability')
+    if scoring not in SCORING_MODES:
+        raise RequestError(400, f"'scoring' must be one of {list(SCORING_MODES)}")
+    return top_k, scoring
+
+
+def _parse_params(raw: Any) -> Dict[str, str]:
+    if not isinstance(raw, dict):
+        raise RequestError(400, 'each parameter set must be a JSON object')
+    missing = [field for field in CONDITION_FIELDS if not isinstance(raw.get(field), str)]
+    if missing:
+        raise RequestError(400, f'missing or non-string fields: {", ".join(missing)}')
+    return {field: raw[field] for field in CONDITION_FIELDS}
+
+
+def _recommendation_json(recommendation: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'material': recommendation['material'],
+        'score': float(recommendation['score']),
+        'properties': dict(recommendation['properties']),
+        'advantages': list(recommendation['advantages'])
+    }
+
+
+class MicroBatcher:
+    """Collects concurrent requests for a short window and scores them as one batch.
+
+    The queue is bounded: when it is full, submit() fails fast with 503 so that
+    overload turns into quick rejections rather than unbounded latency.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, window_ms: float, max_batch_size: int, max_pending: int):
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.batches = 0
+        self.batched_requests = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, params: Dict[str, str], top_k: Optional[int], scoring: str) -> List[Dict[str, Any]]:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((params, top_k, scoring, future))
+        except asyncio.QueueFull:
+            raise RequestError(503, 'too many pending requests', {'Retry-After': '1'})
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            self.batched_requests += len(batch)
+            await self._score(loop, batch)
+
+    async def _score(self, loop: asyncio.AbstractEventLoop, batch: List[tuple]) -> None:
+        # Requests can only share a batch when they ask for the same top_k and scoring mode
+        groups: Dict[Tuple[Optional[int], str], List[tuple]] = {}
+        for item in batch:
+            groups.setdefault((item[1], item[2]), []).append(item)
+
+        for (top_k, scoring), items in groups.items():
+            try:
+                result = await loop.run_in_executor(
+                    self.executor, get_recommendations_batch, [item[0] for item in items], top_k, scoring
+                )
+            except Exception as exc:
+                for item in items:
+                    if not item[3].done():
+                        item[3].set_exception(exc)
+                continue
+            for index, item in enumerate(items):
+                if not item[3].done():
+                    item[3].set_result([_recommendation_json(rec) for rec in result.recommendations(index)])
+
+
+class RecommendationService:
+    """Minimal HTTP/1.1 server with keep-alive, built on asyncio streams."""
+
+    def __init__(
+        self,
+        window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_bulk_size: int = DEFAULT_MAX_BULK_SIZE,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES
+    ):
+        # One scoring thread: NumPy releases the GIL, and batches should not contend with each other
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scoring')
+        self.batcher_options = (window_ms, max_batch_size, max_pending)
+        self.batcher: Optional[MicroBatcher] = None
+        self.max_bulk_size = max_bulk_size
+        self.max_body_bytes = max_body_bytes
+        self.bulk_slots: Optional[asyncio.Semaphore] = None
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        self.batcher = MicroBatcher(self.executor, *self.batcher_options)
+        self.batcher.start()
+        # Bulk jobs are large; a couple may queue but further ones are rejected
+        self.bulk_slots = asyncio.Semaphore(2)
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def stop(self) -> None:
+        if self.batcher:
+            await self.batcher.stop()
+        self.executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'malformed request line'}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {'error': 'invalid Content-Length'}, keep_alive=False)
+                    break
+                if length > self.max_body_bytes:
+                    await self._respond(writer, 413, {'error': 'request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload, extra_headers = 200, await self._route(method, path, body), {}
+                except RequestError as exc:
+                    status, payload, extra_headers = exc.status, {'error': str(exc)}, exc.headers
+                except Exception as exc:
+                    status, payload, extra_headers = 500, {'error': f'{type(exc).__name__}: {exc}'}, {}
+                await self._respond(writer, status, payload, keep_alive, extra_headers)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> Dict[str, Any]:
+        path = path.split('?', 1)[0]
+        if path == '/health':
+            if method != 'GET':
+                raise RequestError(405, 'use GET')
+            # Resolving the catalog may re-hash or recompile it, so it stays off the event loop
+            catalog = await asyncio.get_running_loop().run_in_executor(self.executor, get_active_catalog)
+            return {
+                'status': 'ok',
+                'catalog_size': len(catalog),
+                'pending': self.batcher.queue.qsize(),
+                'batches': self.batcher.batches,
+                'batched_requests': self.batcher.batched_requests
+            }
+        if path not in ('/recommendations', '/recommendations/bulk'):
+            raise RequestError(404, f'no route for {path}')
+        if method != 'POST':
+            raise RequestError(405, 'use POST')
+
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(400, 'body is not valid JSON')
+        if not isinstance(request, dict):
+            raise RequestError(400, 'body must be a JSON object')
+        top_k, scoring = _parse_options(request)
+
+        if path == '/recommendations':
+            recommendations = await self.batcher.submit(_parse_params(request), top_k, scoring)
+            return {'recommendations': recommendations}
+        return await self._bulk(request, top_k, scoring)
+
+    async def _bulk(self, request: Dict[str, Any], top_k: Optional[int], scoring: str) -> Dict[str, Any]:
+        raw_params = request.get('params')
+        if not isinstance(raw_params, list):
+            raise RequestError(400, "'params' must be a list of parameter sets")
+        if len(raw_params) > self.max_bulk_size:
+            raise RequestError(413, f'at most {self.max_bulk_size} parameter sets per bulk request')
+        params_list = [_parse_params(raw) for raw in raw_params]
+
+        if self.bulk_slots.locked():
+            raise RequestError(503, 'bulk capacity exhausted', {'Retry-After': '5'})
+        async with self.bulk_slots:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, get_recommendations_batch, params_list, top_k, scoring
+            )
+
+        materials = result.materials
+        results = []
+        for ranking, scores in zip(result.ranking, result.scores):
+            results.append({
+                'recommendations': [
+                    {'material': materials[index], 'score': float(score)} for index, score in zip(ranking, scores)
+                ]
+            })
+        return {'results': results}
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Dict[str, Any],
+        keep_alive: bool,
+        extra_headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+            **(extra_headers or {})
+        }
+        head = f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}\r\n'
+        head += ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+
+
+async def serve(host: str, port: int, **options) -> None:
+    service = RecommendationService(**options)
+    server = await service.start(host, port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    print(f'Serving recommendations on http://{host}:{port}', flush=True)
+    async with server:
+        await stop.wait()
+    await service.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Headless material recommendation service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--batch-window-ms', type=float, default=DEFAULT_BATCH_WINDOW_MS,
+                        help='how long to collect concurrent requests into one batch')
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help='queued single requests before new ones get 503')
+    parser.add_argument('--max-bulk-size', type=int, default=DEFAULT_MAX_BULK_SIZE)
+    args = parser.parse_args(argv)
+
+    # Warm the compiled catalog before accepting traffic
+    get_active_catalog()
+    asyncio.run(serve(
+        args.host, args.port,
+        window_ms=args.batch_window_ms,
+        max_batch_size=args.max_batch_size,
+        max_pending=args.max_pending,
+        max_bulk_size=args.max_bulk_size
+    ))
+
+
+if __name__ == '__main__':
+    main()
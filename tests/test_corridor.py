@@ -0,0 +1,71 @@
+"""Segment normalization and section merging in corridor mode."""
+import pytest
+
+from utils.corridor import iter_segments, merge_sections, plan_corridor
+
+CONDITIONS = {'traffic_load': 'high', 'weather': 'wet', 'soil_type': 'clayey'}
+
+
+def scored(start_km, end_km, material, score, **conditions):
+    return {'start_km': start_km, 'end_km': end_km, 'material': material, 'score': score, **CONDITIONS, **conditions}
+
+
+def test_adjacent_segments_with_one_material_merge():
+    sections = list(merge_sections([
+        scored(0.0, 1.0, 'A', 80.0),
+        scored(1.0, 4.0, 'A', 60.0, weather='dry'),
+        scored(4.0, 5.0, 'A', 70.0)
+    ]))
+    assert len(sections) == 1
+    section = sections[0]
+    assert (section['start_km'], section['end_km'], section['length_km'], section['segments']) == (0.0, 5.0, 5.0, 3)
+    assert section['mean_score'] == pytest.approx((80.0 + 3 * 60.0 + 70.0) / 5)
+    assert section['min_score'] == 60.0
+    assert section['weather'] == ['wet', 'dry']
+    assert section['traffic_load'] == ['high']
+
+
+def test_chainage_gap_starts_a_new_section():
+    sections = list(merge_sections([
+        scored(0.0, 1.0, 'A', 80.0),
+        scored(2.5, 3.0, 'A', 60.0),
+        scored(3.0, 4.0, 'A', 70.0)
+    ]))
+    assert [(section['start_km'], section['end_km']) for section in sections] == [(0.0, 1.0), (2.5, 4.0)]
+    # The gap is not counted in either section's length or mean score
+    assert [section['length_km'] for section in sections] == [1.0, 1.5]
+    assert sections[1]['mean_score'] == pytest.approx((0.5 * 60.0 + 70.0) / 1.5)
+
+
+def test_material_change_starts_a_new_section():
+    sections = list(merge_sections([
+        scored(0.0, 1.0, 'A', 80.0),
+        scored(1.0, 2.0, 'B', 60.0),
+        scored(2.0, 3.0, 'A', 70.0)
+    ]))
+    assert [(section['material'], section['start_km'], section['end_km']) for section in sections] == [
+        ('A', 0.0, 1.0), ('B', 1.0, 2.0), ('A', 2.0, 3.0)
+    ]
+    assert list(merge_sections([])) == []
+
+
+def test_segments_follow_on_or_leave_gaps():
+    segments = list(iter_segments([
+        {'length_km': 2, **CONDITIONS},
+        {'length_km': '1.5', **CONDITIONS},
+        {'start_km': 5, 'end_km': 6, **CONDITIONS}
+    ]))
+    assert [(segment['start_km'], segment['end_km']) for segment in segments] == [(0.0, 2.0), (2.0, 3.5), (5.0, 6.0)]
+    with pytest.raises(ValueError, match='Segment 2 runs from 1.0'):
+        list(iter_segments([{'length_km': 2, **CONDITIONS}, {'start_km': 1, 'length_km': 1, **CONDITIONS}]))
+
+
+def test_plan_keeps_the_gap_out_of_the_length():
+    rows = [
+        {'start_km': 0, 'end_km': 1, **CONDITIONS},
+        {'start_km': 1, 'end_km': 2, **CONDITIONS},
+        {'start_km': 3, 'end_km': 4, **CONDITIONS}
+    ]
+    plan = plan_corridor(rows)
+    assert (plan['segments'], plan['length_km'], plan['distinct_conditions']) == (3, 3.0, 1)
+    assert [(section['start_km'], section['end_km']) for section in plan['sections']] == [(0.0, 2.0), (3.0, 4.0)]
@@ -0,0 +1,106 @@
+"""optimize_network against brute force on small networks."""
+from itertools import product
+
+import numpy as np
+import pytest
+
+from data.materials_database import SOIL_TYPES, TRAFFIC_LOADS, WEATHER_CONDITIONS
+from utils.lifecycle import CONSTRUCTION_COST_PER_RATING
+from utils.network_optimizer import optimize_network
+from utils.recommendation_engine import WEIGHT_FACTORS
+from utils.scoring_engine import CompiledCatalog
+
+PROVEN = ('is below the cheapest assignment', 'Supply limits leave no material')
+
+
+def material(cost, quality=5, traffic_load=TRAFFIC_LOADS, weather=('all',)):
+    return {
+        'properties': {
+            'durability': quality, 'cost': cost / CONSTRUCTION_COST_PER_RATING, 'weather_resistance': quality,
+            'load_capacity': quality, 'maintenance': 5
+        },
+        'suitable_conditions': {'traffic_load': list(traffic_load), 'weather': list(weather), 'soil_type': ['all']},
+        'advantages': []
+    }
+
+
+def segment(length_km, traffic_load='high', weather='hot', soil_type='rocky'):
+    return {'traffic_load': traffic_load, 'weather': weather, 'soil_type': soil_type, 'length_km': length_km}
+
+
+def brute_force(catalog, segments, supply_km, budget):
+    """Cheapest assignment within the supply limits and best value within the budget too."""
+    cost = catalog.properties[:, 1] * CONSTRUCTION_COST_PER_RATING
+    lengths = np.array([item['length_km'] for item in segments])
+    scores = np.array([catalog.score(item, WEIGHT_FACTORS) for item in segments])
+    rows = np.arange(len(segments))
+    limited = {catalog.names.index(name): km for name, km in supply_km.items()}
+    cheapest, best = np.inf, -np.inf
+    for combo in product(range(len(catalog)), repeat=len(segments)):
+        combo = np.array(combo)
+        if any(lengths[combo == index].sum() > km + 1e-9 for index, km in limited.items()):
+            continue
+        total = (cost[combo] * lengths).sum()
+        cheapest = min(cheapest, total)
+        if total <= budget + 1e-9:
+            best = max(best, (scores[rows, combo] * lengths).sum())
+    return cheapest, best
+
+
+def random_instance(rng):
+    catalog = CompiledCatalog({
+        f'M{number}': material(
+            float(rng.choice([10, 40, 100])),
+            quality=int(rng.integers(1, 11)),
+            traffic_load=rng.choice(TRAFFIC_LOADS, 2, replace=False),
+            weather=rng.choice(WEATHER_CONDITIONS, 2, replace=False)
+        )
+        for number in range(int(rng.integers(3, 6)))
+    })
+    segments = [
+        segment(float(rng.integers(1, 5)), rng.choice(TRAFFIC_LOADS), rng.choice(WEATHER_CONDITIONS), rng.choice(SOIL_TYPES))
+        for _ in range(int(rng.integers(3, 6)))
+    ]
+    limited = rng.choice(catalog.names, int(rng.integers(1, len(catalog) + 1)), replace=False)
+    supply_km = {str(name): float(rng.integers(0, 9)) for name in limited}
+    return catalog, segments, supply_km
+
+
+def test_start_uses_limited_supply_where_it_saves_most():
+    # Longest-first would spend the 4 km of M0 on one 3 km segment and end up at 390
+    catalog = CompiledCatalog({
+        f'M{number}': material(cost, quality=5 + number) for number, cost in enumerate([10, 40, 100, 40, 100, 100])
+    })
+    segments = [segment(length) for length in [2, 2, 3, 2, 3]]
+    plan = optimize_network(segments, 379, {'M0': 4}, catalog=catalog)
+    assert plan.total_cost <= 379
+    assert plan.lengths[plan.materials == 0].sum() <= 4
+    with pytest.raises(ValueError, match='is below the cheapest assignment'):
+        optimize_network(segments, 355, {'M0': 4}, catalog=catalog)
+
+
+def test_supply_shortage_is_reported():
+    catalog = CompiledCatalog({'A': material(10), 'B': material(40)})
+    with pytest.raises(ValueError, match='Supply limits leave no material'):
+        optimize_network([segment(3), segment(3)], 1000, {'A': 4, 'B': 2}, catalog=catalog)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(15):
+        catalog, segments, supply_km = random_instance(rng)
+        cheapest, _ = brute_force(catalog, segments, supply_km, np.inf)
+        budget = (cheapest if np.isfinite(cheapest) else 100.0) * rng.uniform(0.9, 1.3)
+        _, best = brute_force(catalog, segments, supply_km, budget)
+        if best == -np.inf:
+            with pytest.raises(ValueError, match='|'.join(PROVEN)):
+                optimize_network(segments, budget, supply_km, catalog=catalog)
+            continue
+
+        plan = optimize_network(segments, budget, supply_km, catalog=catalog)
+        assert plan.total_cost <= budget + 1e-6
+        for name, km in supply_km.items():
+            assert plan.lengths[plan.materials == catalog.names.index(name)].sum() <= km + 1e-9
+        assert plan.total_value <= best + 1e-6
+        assert plan.upper_bound >= best - 1e-6
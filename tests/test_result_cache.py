@@ -0,0 +1,88 @@
+"""Byte budgets of ResultCache's memory and SQLite tiers."""
+import itertools
+import json
+import sqlite3
+
+import pytest
+
+import utils.result_cache as result_cache
+from utils.result_cache import ResultCache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Strictly increasing stored_at times, so the oldest row is well defined."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(result_cache.time, 'time', lambda: float(next(ticks)))
+
+
+def document(number):
+    return {'rank': number, 'padding': 'x' * 80}
+
+
+def size(value):
+    return len(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def stored(path):
+    connection = sqlite3.connect(path)
+    try:
+        return dict(connection.execute('SELECT key, LENGTH(value) FROM results ORDER BY stored_at').fetchall())
+    finally:
+        connection.close()
+
+
+def test_disk_tier_drops_the_oldest_rows_over_budget(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    # No memory tier, so every lookup goes to disk
+    cache = ResultCache(max_bytes=0, path=path, max_disk_bytes=3 * size(document(0)))
+    for number in range(5):
+        cache.put(f'key{number}', document(number))
+
+    assert list(stored(path)) == ['key2', 'key3', 'key4']
+    assert cache.get('key1') is None
+    assert cache.get('key4') == document(4)
+    stats = cache.stats()
+    assert stats['disk_bytes'] == sum(stored(path).values())
+    assert stats['disk_evictions'] == 2
+    cache.close()
+
+
+def test_replacing_a_key_counts_its_bytes_once(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    # Counting the replaced row too would push the tier over budget
+    cache = ResultCache(max_bytes=0, path=path, max_disk_bytes=2 * size(document(0)))
+    cache.put('key0', document(0))
+    cache.put('key1', document(1))
+    cache.put('key0', document(5))
+
+    assert stored(path) == {'key1': size(document(1)), 'key0': size(document(5))}
+    assert cache.stats()['disk_bytes'] == size(document(1)) + size(document(5))
+    assert cache.stats()['disk_evictions'] == 0
+    cache.close()
+
+
+def test_reopening_with_a_smaller_budget_prunes_at_once(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    cache = ResultCache(max_bytes=0, path=path)
+    for number in range(4):
+        cache.put(f'key{number}', document(number))
+    cache.close()
+
+    reopened = ResultCache(max_bytes=0, path=path, max_disk_bytes=size(document(0)))
+    assert list(stored(path)) == ['key3']
+    assert reopened.stats()['disk_bytes'] == size(document(3))
+    assert reopened.get('key3') == document(3)
+    reopened.close()
+
+
+def test_disk_hit_is_promoted_into_memory(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    ResultCache(path=path).put('key0', document(0))
+
+    cache = ResultCache(path=path)
+    assert cache.get('key0') == document(0)
+    assert cache.get('key0') == document(0)
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['hits'], stats['entries']) == (1, 1, 1)
+    cache.close()
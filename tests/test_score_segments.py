@@ -0,0 +1,85 @@
+"""Checkpoint and resume of score_segments."""
+import csv
+import os
+
+import pytest
+
+import score_segments
+from data.materials_database import SOIL_TYPES, TRAFFIC_LOADS, WEATHER_CONDITIONS
+
+
+@pytest.fixture
+def segments(tmp_path):
+    path = tmp_path / 'segments.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'traffic_load', 'weather', 'soil_type'])
+        for number in range(8):
+            writer.writerow([
+                f'S{number}', TRAFFIC_LOADS[number % len(TRAFFIC_LOADS)],
+                WEATHER_CONDITIONS[number % len(WEATHER_CONDITIONS)], SOIL_TYPES[number % len(SOIL_TYPES)]
+            ])
+    return str(path)
+
+
+def score(segments, output, *options):
+    return score_segments.main([segments, output, '--workers', '0', '--chunk-size', '3', *options])
+
+
+def test_resume_drops_the_chunk_written_after_the_last_checkpoint(segments, tmp_path, monkeypatch):
+    expected = str(tmp_path / 'expected.csv')
+    score(segments, expected)
+    output = str(tmp_path / 'scored.csv')
+
+    # Fail after the second chunk is written to the output but before its checkpoint is saved
+    save = score_segments.Checkpoint.save
+    calls = []
+
+    def failing_save(self, *args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise OSError('interrupted')
+        save(self, *args)
+
+    monkeypatch.setattr(score_segments.Checkpoint, 'save', failing_save)
+    with pytest.raises(OSError):
+        score(segments, output)
+    monkeypatch.undo()
+
+    state = score_segments.Checkpoint(output).load()
+    assert state['rows_done'] == 3
+    assert os.path.getsize(output) > state['output_bytes']
+
+    def failing_score(*args):
+        raise OSError('interrupted')
+
+    # The partial chunk is dropped as soon as the run resumes
+    monkeypatch.setattr(score_segments, 'score_chunk', failing_score)
+    with pytest.raises(OSError):
+        score(segments, output, '--resume')
+    assert os.path.getsize(output) == state['output_bytes']
+    monkeypatch.undo()
+
+    score(segments, output, '--resume')
+    with open(output) as result, open(expected) as reference:
+        assert result.read() == reference.read()
+    assert score_segments.Checkpoint(output).load() is None
+
+
+def test_resume_rejects_a_different_top_k(segments, tmp_path):
+    output = str(tmp_path / 'scored.csv')
+    score_segments.Checkpoint(output).save(0, 0, 3)
+    open(output, 'w').close()
+    with pytest.raises(SystemExit, match='--top-k 3'):
+        score(segments, output, '--resume', '--top-k', '2')
+
+
+def test_resume_without_a_checkpoint_starts_over(segments, tmp_path):
+    expected = str(tmp_path / 'expected.csv')
+    output = str(tmp_path / 'scored.csv')
+    score(segments, expected)
+    with open(output, 'w') as f:
+        f.write('stale\n')
+    score(segments, output, '--resume')
+    with open(output) as result, open(expected) as reference:
+        assert result.read() == reference.read()
@@ -0,0 +1,206 @@
+"""Parity of the compiled scoring paths with calculate_material_score."""
+import copy
+from itertools import product
+
+import numpy as np
+import pytest
+
+import utils.recommendation_engine as engine
+import utils.scoring_engine as scoring_engine
+from data.materials_database import MATERIALS_DATABASE, SOIL_TYPES, TRAFFIC_LOADS, WEATHER_CONDITIONS
+from utils.scoring_engine import (
+    CONDITION_FIELDS, KNOWN_VALUES, AnswerTable, CompiledCatalog, IncrementalScorer, invalidate_compiled_catalog,
+    rank_scores, top_k_indices
+)
+
+# Every known combination plus one value per field that no material lists
+ALL_PARAMS = [
+    {'location': 'Test', 'traffic_load': traffic_load, 'weather': weather, 'soil_type': soil_type}
+    for traffic_load, weather, soil_type in product(
+        TRAFFIC_LOADS + ['extreme'], WEATHER_CONDITIONS + ['arctic'], SOIL_TYPES + ['peat']
+    )
+]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """A private copy of MATERIALS_DATABASE served as the active catalog, safe to edit in place."""
+    materials = copy.deepcopy(MATERIALS_DATABASE)
+    monkeypatch.setattr(engine, 'CATALOG_PATH', None)
+    monkeypatch.setattr(engine, 'MATERIALS_DATABASE', materials)
+    # A freed copy's id can be reused by the next test's copy
+    invalidate_compiled_catalog()
+    return materials
+
+
+def baseline_ranking(materials, params):
+    """(name, score) pairs ranked as the scalar implementation ranks them."""
+    scored = [(name, engine.calculate_material_score(entry, params)) for name, entry in materials.items()]
+    return sorted(scored, key=lambda pair: pair[1], reverse=True)
+
+
+def names_and_scores(recommendations):
+    return [(rec['material'], float(rec['score'])) for rec in recommendations]
+
+
+@pytest.mark.parametrize('params', ALL_PARAMS)
+def test_catalog_score_matches_scalar(database, params):
+    catalog = CompiledCatalog(database)
+    expected = [engine.calculate_material_score(entry, params) for entry in database.values()]
+    assert catalog.score(params, engine.WEIGHT_FACTORS).tolist() == expected
+
+
+@pytest.mark.parametrize('use_answer_table', [True, False])
+def test_recommendations_match_scalar(database, use_answer_table):
+    for params in ALL_PARAMS:
+        expected = baseline_ranking(database, params)
+        recommendations = engine.get_recommendations(params, use_answer_table=use_answer_table)
+        assert names_and_scores(recommendations) == expected
+        top = engine.get_recommendations(params, use_answer_table=use_answer_table, top_k=3)
+        assert names_and_scores(top) == expected[:3]
+
+
+def test_batch_matches_scalar(database):
+    batch = engine.get_recommendations_batch(ALL_PARAMS)
+    for index, params in enumerate(ALL_PARAMS):
+        assert names_and_scores(batch.recommendations(index)) == baseline_ranking(database, params)
+
+
+def test_incremental_scorer_matches_full_scoring(database):
+    catalog = engine.get_active_catalog()
+    scorer = IncrementalScorer(catalog, engine.WEIGHT_FACTORS)
+    # Consecutive parameter sets differ in one field most of the time
+    for params in ALL_PARAMS:
+        expected = catalog.score(params, engine.WEIGHT_FACTORS)
+        assert np.array_equal(scorer.score(params), expected)
+        for k in (0, 1, 4, None):
+            ranking, scores = scorer.top_k(params, k)
+            assert np.array_equal(ranking, top_k_indices(expected, k))
+            assert np.array_equal(scores, expected[ranking])
+
+
+def test_recommendations_with_scorer_match_scalar(database):
+    scorer = engine.get_incremental_scorer()
+    for params in ALL_PARAMS:
+        recommendations = engine.get_recommendations(params, top_k=5, scorer=scorer)
+        assert names_and_scores(recommendations) == baseline_ranking(database, params)[:5]
+
+
+@pytest.mark.parametrize('depth', [3, 10_000])
+def test_answer_table_matches_full_ranking(database, depth):
+    catalog = engine.get_active_catalog()
+    table = AnswerTable(catalog, engine.WEIGHT_FACTORS, depth=depth).build()
+    for params in ALL_PARAMS:
+        expected = catalog.score(params, engine.WEIGHT_FACTORS)
+        ranking = rank_scores(expected)
+        for k in (0, 1, 3, None):
+            answer = table.lookup(params, k)
+            known = all(params[field] in KNOWN_VALUES[field] for field in CONDITION_FIELDS)
+            if not known or not table.covers(k):
+                assert answer is None
+                continue
+            assert np.array_equal(answer[0], ranking[:k])
+            assert np.array_equal(answer[1], expected[ranking[:k]])
+
+
+def test_comprehensive_batch_matches_scalar(database):
+    from utils.advanced_calculations import get_comprehensive_score, get_comprehensive_scores_batch
+
+    catalog = engine.get_active_catalog()
+    batch = get_comprehensive_scores_batch(ALL_PARAMS, catalog)['final_score']
+    for row, params in enumerate(ALL_PARAMS):
+        expected = [
+            get_comprehensive_score(params, {**entry, 'material': name})['final_score']
+            for name, entry in database.items()
+        ]
+        assert batch[row].tolist() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'use_answer_table': False},
+    {'scoring': 'comprehensive'},
+    {'scorer': 'session'}
+])
+def test_top_k_is_validated_on_every_path(database, options):
+    if options.get('scorer') == 'session':
+        options = {'scorer': engine.get_incremental_scorer()}
+    params = ALL_PARAMS[0]
+    assert engine.get_recommendations(params, top_k=0, **options) == []
+    for top_k in (-1, 2.5, True, '3'):
+        with pytest.raises(ValueError):
+            engine.get_recommendations(params, top_k=top_k, **options)
+
+
+def test_batch_validates_top_k(database):
+    empty = engine.get_recommendations_batch(ALL_PARAMS[:2], top_k=0)
+    assert empty.ranking.shape == (2, 0)
+    assert empty.best_materials() == [None, None]
+    with pytest.raises(ValueError):
+        engine.get_recommendations_batch(ALL_PARAMS[:2], top_k=-1)
+
+
+def test_in_place_rename_is_picked_up(database):
+    params = {'location': 'Test', 'traffic_load': 'low', 'weather': 'dry', 'soil_type': 'rocky'}
+    engine.build_answer_table()
+    before = [rec['material'] for rec in engine.get_recommendations(params)]
+    old_name = before[0]
+    database['Renamed Material'] = database.pop(old_name)
+    invalidate_compiled_catalog()
+
+    after = [rec['material'] for rec in engine.get_recommendations(params)]
+    assert old_name not in after
+    assert 'Renamed Material' in after
+    assert names_and_scores(engine.get_recommendations(params)) == baseline_ranking(database, params)
+
+
+def test_in_place_property_edit_rebuilds_answer_table(database):
+    params = {'location': 'Test', 'traffic_load': 'high', 'weather': 'wet', 'soil_type': 'clayey'}
+    table = engine.build_answer_table()
+    scorer = engine.get_incremental_scorer()
+    last = engine.get_recommendations(params)[-1]['material']
+    database[last]['properties'].update(durability=10, weather_resistance=10, load_capacity=10)
+    database[last]['suitable_conditions'].update(traffic_load=['high'], weather=['all'], soil_type=['all'])
+    invalidate_compiled_catalog()
+
+    assert engine.get_answer_table() is not table
+    assert not scorer.is_current(engine.get_active_catalog(), engine.WEIGHT_FACTORS)
+    recommendations = engine.get_recommendations(params)
+    assert recommendations[0]['material'] == last
+    assert names_and_scores(recommendations) == baseline_ranking(database, params)
+
+
+def test_in_place_edit_is_picked_up_after_the_poll_interval(database, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(scoring_engine.time, 'monotonic', lambda: clock[0])
+    invalidate_compiled_catalog()
+    params = {'location': 'Test', 'traffic_load': 'low', 'weather': 'dry', 'soil_type': 'rocky'}
+    old_name = engine.get_recommendations(params)[0]['material']
+    database['Renamed Material'] = database.pop(old_name)
+
+    # Same dict and length: the compiled catalog is reused until the contents are re-hashed
+    clock[0] += scoring_engine.CATALOG_POLL_INTERVAL / 2
+    assert engine.get_recommendations(params)[0]['material'] == old_name
+    clock[0] += scoring_engine.CATALOG_POLL_INTERVAL
+    assert names_and_scores(engine.get_recommendations(params)) == baseline_ranking(database, params)
+
+
+def test_growing_the_catalog_is_picked_up_at_once(database):
+    engine.get_recommendations(ALL_PARAMS[0])
+    database['New Material'] = copy.deepcopy(next(iter(database.values())))
+    assert 'New Material' in [rec['material'] for rec in engine.get_recommendations(ALL_PARAMS[0])]
+
+
+def test_properties_read_back_as_in_the_source(database, tmp_path):
+    from utils.catalog_loader import MappedCatalog, write_compiled_catalog
+
+    database[next(iter(database))]['properties']['cost'] = 6.5
+    path = write_compiled_catalog(database, str(tmp_path / 'materials.catalog'))
+    for catalog in (CompiledCatalog(database), MappedCatalog(path)):
+        for entry, view in zip(database.values(), catalog.entries):
+            properties = dict(view['properties'])
+            assert properties == entry['properties']
+            # A field with any non-integer value reads back as float throughout
+            assert [type(value) for value in properties.values()] == [int, float, int, int, int]
+        records = catalog.property_records([1, 0])
+        assert records['durability'].dtype == np.int64 and records['cost'].dtype == np.float64
@@ -1,14 +1,46 @@
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from utils.instrumentation import timed
+from utils.scoring_engine import PROPERTY_FIELDS, CompiledCatalog
+
+LOAD_FACTORS = {
+    'low': 0.6,       # Increased base factors to be less restrictive
+    'medium': 0.8,
+    'high': 0.9,
+    'very high': 1.0
+}
+
+WEATHER_FACTORS = {
+    'hot': {'durability_weight': 0.4, 'weather_resistance_weight': 0.6},
+    'moderate': {'durability_weight': 0.5, 'weather_resistance_weight': 0.5},
+    'cold': {'durability_weight': 0.4, 'weather_resistance_weight': 0.6},
+    'wet': {'durability_weight': 0.3, 'weather_resistance_weight': 0.7},
+    'dry': {'durability_weight': 0.6, 'weather_resistance_weight': 0.4}
+}
+
+TRAFFIC_FACTORS = {'low': 0.7, 'medium': 0.85, 'high': 1.0, 'very high': 1.15}
+
+# Adjusted weights to be more balanced
+COMPREHENSIVE_WEIGHTS = {
+    'load_capacity': 0.3,
+    'cost_efficiency': 0.25,
+    'environmental_impact': 0.2,
+    'weather_resistance': 0.25
+}
+
+def _weather_impact(weather: str) -> float:
+    """Weather multiplier used by calculate_maintenance_prediction."""
+    if weather in ['hot', 'wet']:
+        return 1.15
+    elif weather in ['cold']:
+        return 1.1
+    return 1.0
 
+@timed()
 def calculate_load_bearing_capacity(traffic_load: str, material_properties: Dict[str, Any]) -> float:
     """Calculate the load bearing capacity score based on traffic load and material properties."""
-    load_factors = {
-        'low': 0.6,       # Increased base factors to be less restrictive
-        'medium': 0.8,
-        'high': 0.9,
-        'very high': 1.0
-    }
+    load_factors = LOAD_FACTORS
 
     base_capacity = material_properties['properties']['load_capacity']
     load_multiplier = load_factors.get(traffic_load, 0.8)  # Default to medium if unknown
@@ -16,6 +48,7 @@ def calculate_load_bearing_capacity(traffic_load: str, material_properties: Dict
 
     return (base_capacity * load_multiplier * durability_factor) * 10
 
+@timed()
 def calculate_cost_efficiency(material_properties: Dict[str, Any]) -> float:
     """Calculate cost efficiency considering initial cost and maintenance."""
     cost = material_properties['properties']['cost']
@@ -28,6 +61,7 @@ def calculate_cost_efficiency(material_properties: Dict[str, Any]) -> float:
 
     return (lifespan_factor * 0.6 + cost_factor * 0.4) * 10
 
+@timed()
 def calculate_environmental_impact(material_properties: Dict[str, Any], is_recycled: bool) -> float:
     """Calculate environmental impact score."""
     base_score = 6.0  # Lowered default score to allow more variation
@@ -42,15 +76,10 @@ def calculate_environmental_impact(material_properties: Dict[str, Any], is_recyc
 
     return min(10.0, base_score)  # Cap at 10
 
+@timed()
 def calculate_weather_resistance(weather: str, material_properties: Dict[str, Any]) -> float:
     """Calculate weather resistance score based on conditions."""
-    weather_factors = {
-        'hot': {'durability_weight': 0.4, 'weather_resistance_weight': 0.6},
-        'moderate': {'durability_weight': 0.5, 'weather_resistance_weight': 0.5},
-        'cold': {'durability_weight': 0.4, 'weather_resistance_weight': 0.6},
-        'wet': {'durability_weight': 0.3, 'weather_resistance_weight': 0.7},
-        'dry': {'durability_weight': 0.6, 'weather_resistance_weight': 0.4}
-    }
+    weather_factors = WEATHER_FACTORS
 
     factors = weather_factors.get(weather, weather_factors['moderate'])
     durability_score = material_properties['properties']['durability']
@@ -59,6 +88,7 @@ def calculate_weather_resistance(weather: str, material_properties: Dict[str, An
     return (durability_score * factors['durability_weight'] + 
             weather_resistance * factors['weather_resistance_weight']) * 10
 
+@timed()
 def calculate_maintenance_prediction(
     material_properties: Dict[str, Any],
     traffic_load: str,
@@ -69,15 +99,11 @@ def calculate_maintenance_prediction(
     durability = material_properties['properties']['durability']
 
     # Traffic load impact
-    traffic_factors = {'low': 0.7, 'medium': 0.85, 'high': 1.0, 'very high': 1.15}
+    traffic_factors = TRAFFIC_FACTORS
     traffic_impact = traffic_factors.get(traffic_load, 0.85)
 
     # Weather impact
-    weather_impact = 1.0
-    if weather in ['hot', 'wet']:
-        weather_impact = 1.15
-    elif weather in ['cold']:
-        weather_impact = 1.1
+    weather_impact = _weather_impact(weather)
 
     # Calculate maintenance intervals and costs
     maintenance_interval = (durability * 0.7 + (10 - base_maintenance) * 0.3) * 0.5
@@ -90,6 +116,7 @@ def calculate_maintenance_prediction(
         'annual_maintenance_cost_factor': round(annual_maintenance_cost, 2)
     }
 
+@timed()
 def get_comprehensive_score(params: Dict[str, Any], material_properties: Dict[str, Any]) -> Dict[str, float]:
     """Calculate comprehensive material scoring including all advanced metrics."""
     is_recycled = 'Recycled' in material_properties.get('material', '')
@@ -102,13 +129,7 @@ def get_comprehensive_score(params: Dict[str, Any], material_properties: Dict[st
         material_properties, params['traffic_load'], params['weather']
     )
 
-    # Adjusted weights to be more balanced
-    weights = {
-        'load_capacity': 0.3,
-        'cost_efficiency': 0.25,
-        'environmental_impact': 0.2,
-        'weather_resistance': 0.25
-    }
+    weights = COMPREHENSIVE_WEIGHTS
 
     final_score = (
         load_capacity_score * weights['load_capacity'] +
@@ -125,4 +146,80 @@ def get_comprehensive_score(params: Dict[str, Any], material_properties: Dict[st
         'weather_resistance_score': round(weather_resistance_score, 2),
         'maintenance_interval': maintenance_predictions['maintenance_interval_years'],
         'annual_maintenance_cost': maintenance_predictions['annual_maintenance_cost_factor']
-    }
\ No newline at end of file
+    }
+
+def _round(values: np.ndarray, digits: int) -> np.ndarray:
+    """np.round that agrees with the built-in round() used by the scalar functions.
+
+    np.round scales before rounding, so values sitting on a decimal half-way point
+    can round the other way; those few are re-rounded with round() itself.
+    """
+    scaled = np.asarray(values, dtype=np.float64) * 10 ** digits
+    rounded = np.rint(scaled) / 10 ** digits
+    ambiguous = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if ambiguous.any():
+        rounded[ambiguous] = [round(float(value), digits) for value in np.asarray(values)[ambiguous]]
+    return rounded
+
+@timed()
+def get_comprehensive_scores_batch(
+    params_list: List[Dict[str, Any]],
+    catalog: CompiledCatalog
+) -> Dict[str, np.ndarray]:
+    """Array version of get_comprehensive_score for every material and parameter set.
+
+    Returns the same keys as get_comprehensive_score, each a (params, materials) array.
+    Recycled materials are recognised by their catalog name, which is what
+    get_comprehensive_score sees when the material dict carries its 'material' key.
+    """
+    columns = {field: catalog.properties[:, i] for i, field in enumerate(PROPERTY_FIELDS)}
+    durability = columns['durability']
+    maintenance = columns['maintenance']
+
+    # Per-parameter-set factors, shaped as columns so they broadcast across materials
+    load_multiplier = np.array([LOAD_FACTORS.get(p['traffic_load'], 0.8) for p in params_list])[:, None]
+    weather_weights = [WEATHER_FACTORS.get(p['weather'], WEATHER_FACTORS['moderate']) for p in params_list]
+    durability_weight = np.array([w['durability_weight'] for w in weather_weights])[:, None]
+    resistance_weight = np.array([w['weather_resistance_weight'] for w in weather_weights])[:, None]
+    traffic_impact = np.array([TRAFFIC_FACTORS.get(p['traffic_load'], 0.85) for p in params_list])[:, None]
+    weather_impact = np.array([_weather_impact(p['weather']) for p in params_list])[:, None]
+
+    load_capacity_score = (columns['load_capacity'] * load_multiplier * (durability / 10)) * 10
+
+    lifespan_factor = durability * 0.7 + maintenance * 0.3
+    cost_factor = (10 - columns['cost']) / 10
+    cost_efficiency_score = np.broadcast_to(
+        (lifespan_factor * 0.6 + cost_factor * 0.4) * 10, load_capacity_score.shape
+    )
+
+    is_recycled = np.array(['Recycled' in name for name in catalog.names], dtype=bool)
+    environmental_score = np.broadcast_to(
+        np.minimum(10.0, np.where(is_recycled, 6.0 + 3.0, 6.0) + (10 - maintenance) * 0.2),
+        load_capacity_score.shape
+    )
+
+    weather_resistance_score = (
+        durability * durability_weight + columns['weather_resistance'] * resistance_weight
+    ) * 10
+
+    maintenance_interval = (durability * 0.7 + (10 - maintenance) * 0.3) * 0.5
+    maintenance_interval = maintenance_interval / (traffic_impact * weather_impact)
+    annual_maintenance_cost = (maintenance * traffic_impact * weather_impact) / durability * 10
+
+    weights = COMPREHENSIVE_WEIGHTS
+    final_score = (
+        load_capacity_score * weights['load_capacity'] +
+        cost_efficiency_score * weights['cost_efficiency'] +
+        environmental_score * weights['environmental_impact'] +
+        weather_resistance_score * weights['weather_resistance']
+    )
+
+    return {
+        'final_score': _round(final_score, 2),
+        'load_capacity_score': _round(load_capacity_score, 2),
+        'cost_efficiency_score': _round(cost_efficiency_score, 2),
+        'environmental_score': _round(environmental_score, 2),
+        'weather_resistance_score': _round(weather_resistance_score, 2),
+        'maintenance_interval': _round(maintenance_interval, 1),
+        'annual_maintenance_cost': _round(annual_maintenance_cost, 2)
+    }
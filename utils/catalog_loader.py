@@ -0,0 +1,240 @@
+"""External materials catalogs.
+
+Sources in JSON, CSV or SQLite are compiled into a single binary file holding the
+property matrix, the condition bitmasks and a string table. The binary file is
+memory-mapped read-only, so every worker process shares the same pages, and
+CatalogWatcher swaps in a new mapping when the file's mtime changes.
+
+    python -m utils.catalog_loader materials.csv materials.catalog
+"""
+import csv
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.scoring_engine import CONDITION_FIELDS, PROPERTY_FIELDS, CompiledCatalog
+
+MAGIC = b'MATCAT01'
+ALIGNMENT = 64
+COMPILED_SUFFIX = '.catalog'
+
+# Flat column layout shared by the CSV and SQLite sources; list columns are ';'-separated
+FLAT_COLUMNS = ('material',) + PROPERTY_FIELDS + CONDITION_FIELDS + ('advantages',)
+LIST_SEPARATOR = ';'
+SQLITE_TABLE = 'materials'
+
+
+def _split_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value or '').split(LIST_SEPARATOR) if item.strip()]
+
+
+def _number(value: Any) -> Any:
+    """An integer rating as int, anything else as float."""
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return float(value)
+
+
+def _entry_from_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one flat CSV/SQLite row into the MATERIALS_DATABASE entry schema."""
+    return {
+        'properties': {field: _number(record[field]) for field in PROPERTY_FIELDS},
+        'suitable_conditions': {field: _split_list(record[field]) for field in CONDITION_FIELDS},
+        'advantages': _split_list(record.get('advantages'))
+    }
+
+
+def load_source(path: str) -> Dict[str, Dict[str, Any]]:
+    """Read a JSON, CSV or SQLite catalog into the MATERIALS_DATABASE schema.
+
+    JSON may be a mapping of material name to entry, or a list of entries each
+    carrying a 'material' key. CSV files and the SQLite 'materials' table use
+    FLAT_COLUMNS.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {record['material']: {k: v for k, v in record.items() if k != 'material'} for record in data}
+        return data
+    if extension == '.csv':
+        with open(path, newline='') as f:
+            return {row['material']: _entry_from_record(row) for row in csv.DictReader(f)}
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute(f'SELECT {", ".join(FLAT_COLUMNS)} FROM {SQLITE_TABLE}')
+            return {row['material']: _entry_from_record(dict(row)) for row in rows}
+        finally:
+            connection.close()
+    raise ValueError(f"Unsupported catalog source '{path}'; expected .json, .csv or .sqlite")
+
+
+def write_compiled_catalog(materials_database: Dict[str, Dict[str, Any]], target: str) -> str:
+    """Compile a catalog into the binary format and atomically replace `target`."""
+    catalog = CompiledCatalog(materials_database)
+
+    sections = {
+        'properties': catalog.properties,
+        'property_score': catalog.property_score,
+        'name_ids': catalog.name_ids,
+        'advantage_offsets': catalog.advantage_offsets,
+        'advantage_ids': catalog.advantage_ids,
+        'string_offsets': catalog.string_offsets,
+        'string_data': catalog.string_data
+    }
+    for field in CONDITION_FIELDS:
+        sections[f'mask_{field}'] = catalog.condition_masks[field]
+
+    header = {
+        'count': len(catalog),
+        'property_fields': list(PROPERTY_FIELDS),
+        'integer_fields': list(catalog.integer_fields),
+        'vocabularies': catalog.vocabularies,
+        'sections': {}
+    }
+    # Offsets are relative to the end of the header block, so they can be fixed before its size is known
+    offset = 0
+    for name, array in sections.items():
+        header['sections'][name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            for name, array in sections.items():
+                f.seek(data_start + header['sections'][name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return target
+
+
+class MappedCatalog(CompiledCatalog):
+    """CompiledCatalog whose arrays are read-only views of a memory-mapped catalog file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        stat = os.stat(path)
+        self.version = f'{path}:{stat.st_mtime_ns}:{stat.st_size}'
+        self.buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self.buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"'{path}' is not a compiled materials catalog")
+        header_length = int(np.frombuffer(self.buffer, dtype=np.uint64, count=1, offset=len(MAGIC))[0])
+        header_start = len(MAGIC) + 8
+        header = json.loads(bytes(self.buffer[header_start:header_start + header_length]))
+        if header['property_fields'] != list(PROPERTY_FIELDS):
+            raise ValueError(f"'{path}' was compiled with different property fields")
+        data_start = -(-(header_start + header_length) // ALIGNMENT) * ALIGNMENT
+
+        sections = {}
+        for name, spec in header['sections'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape'], dtype=np.int64))
+            sections[name] = np.frombuffer(
+                self.buffer, dtype=dtype, count=count, offset=data_start + spec['offset']
+            ).reshape(spec['shape'])
+
+        self.properties = sections['properties']
+        self.property_score = sections['property_score']
+        self.name_ids = sections['name_ids']
+        self.advantage_offsets = sections['advantage_offsets']
+        self.advantage_ids = sections['advantage_ids']
+        self.string_offsets = sections['string_offsets']
+        self.string_data = sections['string_data']
+        self.vocabularies = header['vocabularies']
+        # Files written before integer fields were recorded read every property as a float
+        self.integer_fields = tuple(header.get('integer_fields', ()))
+        self.condition_masks = {field: sections[f'mask_{field}'] for field in CONDITION_FIELDS}
+        self.names = [self.string(i) for i in self.name_ids]
+        self._init_views()
+
+
+def is_compiled_catalog(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def ensure_compiled(path: str) -> str:
+    """Path of the compiled form of a catalog, recompiling a source whose file is newer."""
+    if is_compiled_catalog(path):
+        return path
+    target = path + COMPILED_SUFFIX
+    if not os.path.exists(target) or os.stat(target).st_mtime_ns < os.stat(path).st_mtime_ns:
+        write_compiled_catalog(load_source(path), target)
+    return target
+
+
+class CatalogWatcher:
+    """Serve a MappedCatalog for a catalog file and reload it when the file's mtime changes.
+
+    `path` may be a compiled catalog or a JSON/CSV/SQLite source; sources are
+    compiled next to themselves. Readers holding the previous catalog keep a
+    valid mapping, since writers replace the file rather than rewriting it.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 2.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._catalog: Optional[MappedCatalog] = None
+        self._mtime_ns: Optional[int] = None
+        self._checked_at = 0.0
+        self.reloads = 0
+
+    def current(self) -> MappedCatalog:
+        """The loaded catalog, reloaded first if the file changed since the last check."""
+        now = time.monotonic()
+        if self._catalog is not None and now - self._checked_at < self.poll_interval:
+            return self._catalog
+        with self._lock:
+            self._checked_at = now
+            mtime_ns = os.stat(self.path).st_mtime_ns
+            if self._catalog is None or mtime_ns != self._mtime_ns:
+                # Build the new catalog fully before publishing it with a single assignment
+                catalog = MappedCatalog(ensure_compiled(self.path))
+                self._catalog, self._mtime_ns = catalog, mtime_ns
+                self.reloads += 1
+        return self._catalog
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compile a materials catalog into the memory-mapped format.')
+    parser.add_argument('source', help='JSON, CSV or SQLite catalog')
+    parser.add_argument('target', nargs='?', help=f'output file (default: <source>{COMPILED_SUFFIX})')
+    args = parser.parse_args(argv)
+
+    target = write_compiled_catalog(load_source(args.source), args.target or args.source + COMPILED_SUFFIX)
+    catalog = MappedCatalog(target)
+    print(f'{len(catalog)} materials -> {target} ({os.path.getsize(target)} bytes)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.scoring_engine import CONDITION_FIELDS, KNOWN_VALUES, WILDCARD, WILDCARD_FIELDS
+
+
+def bits_to_indices(bits: int) -> np.ndarray:
+    """Positions of the set bits of an integer bitset, in ascending order."""
+    if not bits:
+        return np.empty(0, dtype=np.intp)
+    raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder='little'))
+
+
+def indices_to_bits(indices: np.ndarray) -> int:
+    """Integer bitset with the given positions set."""
+    if not len(indices):
+        return 0
+    flags = np.zeros(int(indices.max()) + 1, dtype=bool)
+    flags[indices] = True
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+
+class ConditionIndex:
+    """Inverted index from condition values to bitsets of materials.
+
+    Bit i stands for slot i; slots follow insertion order, and a removed material
+    leaves an empty slot behind, so slot order always matches catalog order.
+    'all' entries in wildcard dimensions are expanded into every value's bitset
+    when a material is added, so queries never need to look at 'all' again.
+    """
+
+    def __init__(self):
+        self.slots: Dict[str, int] = {}
+        self.names: List[Optional[str]] = []
+        self.live = 0
+        self.value_bits: Dict[str, Dict[str, int]] = {
+            field: {value: 0 for value in KNOWN_VALUES[field]} for field in CONDITION_FIELDS
+        }
+        self.wildcard_bits: Dict[str, int] = {field: 0 for field in CONDITION_FIELDS}
+
+    @classmethod
+    def from_catalog(cls, catalog) -> 'ConditionIndex':
+        """Build an index whose slots are the rows of a CompiledCatalog."""
+        index = cls()
+        index.slots = {name: slot for slot, name in enumerate(catalog.names)}
+        index.names = list(catalog.names)
+        index.live = (1 << len(catalog.names)) - 1
+        for field in CONDITION_FIELDS:
+            masks = catalog.condition_masks[field]
+            vocabulary = catalog.vocabularies[field]
+            column_bits = {
+                value: indices_to_bits(np.flatnonzero(masks & np.uint64(1 << code)))
+                for value, code in vocabulary.items()
+            }
+            if field in WILDCARD_FIELDS:
+                wildcard = column_bits.pop(WILDCARD)
+                index.wildcard_bits[field] = wildcard
+                column_bits = {value: bits | wildcard for value, bits in column_bits.items()}
+            index.value_bits[field] = column_bits
+        return index
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.slots
+
+    def add_material(self, name: str, material: Dict[str, Any]) -> int:
+        """Index one material and return its slot; re-adding a name moves it to the end."""
+        if name in self.slots:
+            self.remove_material(name)
+
+        slot = len(self.names)
+        bit = 1 << slot
+        self.slots[name] = slot
+        self.names.append(name)
+        self.live |= bit
+
+        for field in CONDITION_FIELDS:
+            column_bits = self.value_bits[field]
+            values = material['suitable_conditions'][field]
+            if field in WILDCARD_FIELDS and WILDCARD in values:
+                self.wildcard_bits[field] |= bit
+                for value in column_bits:
+                    column_bits[value] |= bit
+                continue
+            for value in values:
+                column_bits[value] = column_bits.get(value, self.wildcard_bits[field]) | bit
+        return slot
+
+    def remove_material(self, name: str) -> None:
+        """Drop a material from every bitset; its slot stays empty."""
+        slot = self.slots.pop(name)
+        clear = ~(1 << slot)
+        self.names[slot] = None
+        self.live &= clear
+        for field in CONDITION_FIELDS:
+            self.wildcard_bits[field] &= clear
+            column_bits = self.value_bits[field]
+            for value in column_bits:
+                column_bits[value] &= clear
+
+    def matching(self, field: str, value: str) -> int:
+        """Bitset of materials compatible with one condition value."""
+        return self.value_bits[field].get(value, self.wildcard_bits[field])
+
+    def groups(self, params: Dict[str, Any]) -> Dict[Tuple[str, ...], int]:
+        """Split materials by exactly which condition fields they satisfy.
+
+        Keys are tuples of matched fields in CONDITION_FIELDS order; empty groups are omitted.
+        """
+        groups = {(): self.live}
+        for field in CONDITION_FIELDS:
+            matched = self.matching(field, params[field])
+            split = {}
+            for fields, bits in groups.items():
+                inside = bits & matched
+                outside = bits & ~matched
+                if inside:
+                    split[fields + (field,)] = inside
+                if outside:
+                    split[fields] = outside
+            groups = split
+        return groups
+
+    def tiers(self, params: Dict[str, Any]) -> Dict[int, int]:
+        """Candidate bitsets keyed by how many condition fields they satisfy (3 = fully compatible)."""
+        tiers = {count: 0 for count in range(len(CONDITION_FIELDS), -1, -1)}
+        for fields, bits in self.groups(params).items():
+            tiers[len(fields)] |= bits
+        return tiers
+
+    def names_for(self, bits: int) -> List[str]:
+        """Material names for the slots set in a bitset."""
+        return [self.names[slot] for slot in bits_to_indices(bits & self.live)]
@@ -0,0 +1,198 @@
+"""Corridor mode: recommendations along a route.
+
+A corridor is an ordered sequence of segments, each a chainage range with its
+own traffic, weather and soil. Segments flow through a chain of generators --
+iter_segments, score_corridor, merge_sections -- so a route of any length is
+handled in one pass. Each distinct condition tuple is scored once with
+get_recommendations, and adjacent segments with the same recommended material
+are merged into contiguous sections.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils.instrumentation import timed
+from utils.recommendation_engine import _check_scoring, get_recommendations
+from utils.scoring_engine import CONDITION_FIELDS
+
+DEFAULT_SPACING_KM = 1.0
+
+
+def iter_segments(rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Normalize rows to segments with float start_km and end_km plus the condition fields.
+
+    A row gives its chainage as start_km and end_km, or as length_km following
+    on from the previous segment. Chainage must not run backwards.
+    """
+    previous_end = 0.0
+    for number, row in enumerate(rows, start=1):
+        missing = [field for field in CONDITION_FIELDS if not row.get(field)]
+        if missing:
+            raise ValueError(f"Segment {number} is missing {', '.join(missing)}")
+        if row.get('start_km') not in (None, ''):
+            start = float(row['start_km'])
+        else:
+            start = previous_end
+        if row.get('end_km') not in (None, ''):
+            end = float(row['end_km'])
+        elif row.get('length_km') not in (None, ''):
+            end = start + float(row['length_km'])
+        else:
+            raise ValueError(f'Segment {number} needs end_km or length_km')
+        if start < previous_end or end <= start:
+            raise ValueError(f'Segment {number} runs from {start} to {end} km after a segment ending at {previous_end} km')
+        previous_end = end
+        segment = {'start_km': start, 'end_km': end}
+        segment.update({field: str(row[field]).strip() for field in CONDITION_FIELDS})
+        yield segment
+
+
+def parse_route(text: str) -> List[Tuple[float, float]]:
+    """(latitude, longitude) vertices from text with one 'latitude, longitude' pair per line."""
+    route = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        values = line.replace(',', ' ').split()
+        try:
+            latitude, longitude = (float(value) for value in values)
+        except ValueError:
+            raise ValueError(f"Route line {number} should be 'latitude, longitude', got '{line.strip()}'")
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError(f'Route line {number} is not a valid coordinate')
+        route.append((latitude, longitude))
+    if len(route) < 2:
+        raise ValueError('A route needs at least two vertices')
+    return route
+
+
+def segments_from_route(
+    route: Sequence[Tuple[float, float]],
+    traffic_load: str,
+    default_conditions: Dict[str, str],
+    spacing_km: float = DEFAULT_SPACING_KM
+) -> Iterator[Dict[str, Any]]:
+    """Segments every `spacing_km` along (latitude, longitude) vertices, with conditions from the location lookup.
+
+    Samples with no reference site nearby use default_conditions' weather and soil_type.
+    """
+    from utils.location_lookup import get_location_index
+
+    samples = get_location_index().resolve_polyline(route, spacing_km)
+    chainage = samples['chainage_km'].tolist()
+    for position in range(len(chainage) - 1):
+        yield {
+            'start_km': chainage[position],
+            'end_km': chainage[position + 1],
+            'traffic_load': traffic_load,
+            'weather': samples['weather'][position] or default_conditions['weather'],
+            'soil_type': samples['soil_type'][position] or default_conditions['soil_type']
+        }
+
+
+def score_corridor(
+    segments: Iterable[Dict[str, Any]],
+    scoring: str = 'suitability',
+    memo: Optional[Dict[Tuple[str, ...], Tuple[str, float]]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Add the best material and its score to each segment, scoring every condition tuple once.
+
+    `memo` maps condition tuples to (material, score) and may be shared between calls.
+    """
+    _check_scoring(scoring)
+    memo = {} if memo is None else memo
+    for segment in segments:
+        conditions = tuple(segment[field] for field in CONDITION_FIELDS)
+        if conditions not in memo:
+            best = get_recommendations(dict(zip(CONDITION_FIELDS, conditions)), top_k=1, scoring=scoring)[0]
+            memo[conditions] = (best['material'], float(best['score']))
+        material, score = memo[conditions]
+        yield {**segment, 'material': material, 'score': score}
+
+
+def merge_sections(scored: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Run-length merge adjacent segments with the same material into sections.
+
+    A gap in chainage always starts a new section. Each section records its
+    chainage, segment count, length-weighted mean and minimum score, and the
+    distinct values of every condition field in order of appearance.
+    """
+    section = None
+    for segment in scored:
+        if section is not None and (
+            segment['material'] != section['material'] or segment['start_km'] != section['end_km']
+        ):
+            yield _close_section(section)
+            section = None
+        length = segment['end_km'] - segment['start_km']
+        if section is None:
+            section = {
+                'start_km': segment['start_km'],
+                'end_km': segment['end_km'],
+                'material': segment['material'],
+                'segments': 0,
+                'weighted_score': 0.0,
+                'min_score': segment['score']
+            }
+            section.update({field: [] for field in CONDITION_FIELDS})
+        section['end_km'] = segment['end_km']
+        section['segments'] += 1
+        section['weighted_score'] += segment['score'] * length
+        section['min_score'] = min(section['min_score'], segment['score'])
+        for field in CONDITION_FIELDS:
+            if segment[field] not in section[field]:
+                section[field].append(segment[field])
+    if section is not None:
+        yield _close_section(section)
+
+
+def _close_section(section: Dict[str, Any]) -> Dict[str, Any]:
+    length = section['end_km'] - section['start_km']
+    section['length_km'] = length
+    section['mean_score'] = section.pop('weighted_score') / length
+    return section
+
+
+@timed()
+def plan_corridor(
+    rows: Iterable[Dict[str, Any]],
+    scoring: str = 'suitability',
+    budget: Optional[float] = None,
+    supply_km: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Sections of a corridor, plus how many segments and distinct condition tuples were scored.
+
+    With a budget, materials are chosen for the whole corridor by optimize_network
+    instead of per segment, and the plan also holds the NetworkPlan as 'network'.
+    """
+    if budget is not None:
+        from utils.network_optimizer import optimize_network
+
+        segments = [{**segment, 'length_km': segment['end_km'] - segment['start_km']} for segment in iter_segments(rows)]
+        network = optimize_network(segments, budget, supply_km, scoring)
+        scored = (
+            {**segment, 'material': network.names[material], 'score': float(score)}
+            for segment, material, score in zip(segments, network.materials, network.scores)
+        )
+        return {
+            'sections': list(merge_sections(scored)),
+            'segments': len(segments),
+            'length_km': float(network.lengths.sum()),
+            'distinct_conditions': len({tuple(segment[field] for field in CONDITION_FIELDS) for segment in segments}),
+            'network': network
+        }
+
+    memo: Dict[Tuple[str, ...], Tuple[str, float]] = {}
+    counted = {'segments': 0, 'length_km': 0.0}
+
+    def counting(segments):
+        for segment in segments:
+            counted['segments'] += 1
+            counted['length_km'] += segment['end_km'] - segment['start_km']
+            yield segment
+
+    sections: List[Dict[str, Any]] = list(merge_sections(score_corridor(counting(iter_segments(rows)), scoring, memo)))
+    return {
+        'sections': sections,
+        'segments': counted['segments'],
+        'length_km': counted['length_km'],
+        'distinct_conditions': len(memo)
+    }
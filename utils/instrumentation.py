@@ -0,0 +1,207 @@
+"""Timing spans for the hot paths, aggregated into latency histograms.
+
+Spans are off unless RECOMMENDER_METRICS=1 (or enable() is called); a disabled
+span costs one flag check. Histograms can be dumped as JSON or Prometheus text,
+or served locally:
+
+    RECOMMENDER_METRICS=1 RECOMMENDER_METRICS_PORT=9464 streamlit run main.py
+    curl localhost:9464/metrics
+"""
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+# Bucket upper bounds in seconds, 1 us to ~10 s in steps of about x2
+BUCKET_BOUNDS = [1e-6 * 2 ** i for i in range(24)]
+
+METRIC_NAME = 'recommender_stage_seconds'
+
+_state = {'enabled': os.environ.get('RECOMMENDER_METRICS', '') not in ('', '0')}
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ('counts', 'count', 'total', 'maximum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.maximum
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.maximum)
+            seen += bucket_count
+        return self.maximum
+
+
+_histograms: Dict[str, Histogram] = {}
+
+
+def enable() -> None:
+    _state['enabled'] = True
+
+
+def disable() -> None:
+    _state['enabled'] = False
+
+
+def is_enabled() -> bool:
+    return _state['enabled']
+
+
+def reset() -> None:
+    with _lock:
+        _histograms.clear()
+
+
+def record(stage: str, seconds: float) -> None:
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def _timed_span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage: str):
+    """Context manager timing a block under `stage`; a shared no-op when disabled."""
+    if not _state['enabled']:
+        return _NO_SPAN
+    return _timed_span(stage)
+
+
+def timed(stage: Optional[str] = None) -> Callable:
+    """Decorator timing every call of a function; the stage defaults to module.function."""
+    def decorate(function: Callable) -> Callable:
+        name = stage or f'{function.__module__}.{function.__name__}'
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Aggregated statistics per stage, in milliseconds."""
+    with _lock:
+        return {
+            stage: {
+                'count': histogram.count,
+                'mean_ms': histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+                'p50_ms': histogram.quantile(0.5) * 1000,
+                'p90_ms': histogram.quantile(0.9) * 1000,
+                'p99_ms': histogram.quantile(0.99) * 1000,
+                'max_ms': histogram.maximum * 1000
+            }
+            for stage, histogram in sorted(_histograms.items())
+        }
+
+
+def prometheus_text() -> str:
+    """All histograms in the Prometheus text exposition format."""
+    lines: List[str] = [
+        f'# HELP {METRIC_NAME} Time spent per instrumented stage.',
+        f'# TYPE {METRIC_NAME} histogram'
+    ]
+    with _lock:
+        for stage, histogram in sorted(_histograms.items()):
+            label = stage.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKET_BOUNDS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {histogram.total:.9f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomically(path: str, content: str) -> None:
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def export(directory: str) -> None:
+    """Write metrics.json and metrics.prom into a directory."""
+    os.makedirs(directory, exist_ok=True)
+    _write_atomically(os.path.join(directory, 'metrics.json'), json.dumps(snapshot(), indent=2))
+    _write_atomically(os.path.join(directory, 'metrics.prom'), prometheus_text())
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = prometheus_text(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(snapshot()), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus) and /metrics.json from a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,217 @@
+"""Multi-year lifecycle cost simulation over (materials x segments x scenarios).
+
+The yearly model extends calculate_maintenance_prediction: each year's traffic
+and weather stress scale the annual maintenance cost factor, and consume a
+share of the material's maintenance interval. Every RESURFACING_INTERVALS
+intervals of accumulated wear the segment is resurfaced at a fraction of its
+construction cost.
+In year 1 of a scenario without growth or weather variation the annual cost
+equals calculate_maintenance_prediction's (unrounded) cost factor.
+
+Costs per km are computed once per distinct traffic/weather stress level for a
+block of materials at a time, then expanded to segments chunk by chunk, so memory
+depends on the chunk size and the number of scenarios, not on the size of the
+catalog or the network.
+"""
+import numpy as np
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from utils.advanced_calculations import TRAFFIC_FACTORS, _weather_impact
+from utils.instrumentation import timed
+from utils.scoring_engine import PROPERTY_FIELDS, CompiledCatalog
+
+YEARS = 50
+DISCOUNT_RATE = 0.04
+
+# Construction cost per km in cost-factor units per point of the material's cost rating
+CONSTRUCTION_COST_PER_RATING = 10.0
+RESURFACING_COST_SHARE = 0.4
+RESURFACING_INTERVALS = 3.0
+
+# Upper bound on (materials x segments x scenarios) cells yielded per chunk, and on
+# (materials x stress classes x scenarios x years) cells of each material block
+LIFECYCLE_CHUNK_ELEMENTS = 1 << 22
+
+
+def generate_scenarios(
+    count: int,
+    years: int = YEARS,
+    growth_mean: float = 0.02,
+    growth_sd: float = 0.01,
+    weather_sd: float = 0.1,
+    seed: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """Random traffic growth rates and weather-year severities for `count` scenarios."""
+    rng = np.random.default_rng(seed)
+    return {
+        'traffic_growth': rng.normal(growth_mean, growth_sd, size=count),
+        'weather_severity': rng.lognormal(-weather_sd ** 2 / 2, weather_sd, size=(count, years))
+    }
+
+
+def _segment_arrays(segments: Sequence[Dict[str, Any]]):
+    traffic = np.array([TRAFFIC_FACTORS.get(segment['traffic_load'], 0.85) for segment in segments])
+    weather = np.array([_weather_impact(segment['weather']) for segment in segments])
+    length = np.array([float(segment.get('length_km', 1.0)) for segment in segments])
+    return traffic, weather, length
+
+
+def _class_costs(
+    properties: np.ndarray,
+    stress: np.ndarray,
+    discount: np.ndarray
+):
+    """Discounted cost per km per (material, stress class, scenario, year) and resurfacings per
+    (material, stress class, scenario) for the materials whose property rows are given."""
+    durability = properties[:, PROPERTY_FIELDS.index('durability')]
+    maintenance = properties[:, PROPERTY_FIELDS.index('maintenance')]
+    cost = properties[:, PROPERTY_FIELDS.index('cost')]
+
+    # Per-material terms of calculate_maintenance_prediction before traffic and weather
+    base_interval = (durability * 0.7 + (10 - maintenance) * 0.3) * 0.5
+    base_annual_cost = maintenance / durability * 10
+    construction = cost * CONSTRUCTION_COST_PER_RATING
+    resurfacing_cost = RESURFACING_COST_SHARE * construction
+
+    # Wear is cumulative stress in maintenance intervals; each RESURFACING_INTERVALS of it is one resurfacing
+    completed = np.floor(
+        np.cumsum(stress, axis=2)[None] / (RESURFACING_INTERVALS * base_interval)[:, None, None, None]
+    )
+    events = np.diff(completed, axis=3, prepend=0.0)
+
+    # Construction is charged in year 0
+    cost_per_km = np.empty(events.shape[:3] + (stress.shape[2] + 1,))
+    cost_per_km[..., 0] = construction[:, None, None]
+    cost_per_km[..., 1:] = (
+        base_annual_cost[:, None, None, None] * stress[None] + resurfacing_cost[:, None, None, None] * events
+    ) * discount
+    return cost_per_km, completed[..., -1].astype(np.int32)
+
+
+def iter_lifecycle(
+    catalog: CompiledCatalog,
+    segments: Sequence[Dict[str, Any]],
+    scenarios: Dict[str, np.ndarray],
+    materials: Optional[np.ndarray] = None,
+    discount_rate: float = DISCOUNT_RATE
+) -> Iterator[Dict[str, Any]]:
+    """Simulate blocks of materials over chunks of segments, yielding each chunk's results as soon as it is done.
+
+    Every yielded dict holds the chunk's `materials` slice (positions in
+    `materials`) and `segments` slice, its net present cost `npc` and
+    `resurfacings` count per (material, segment, scenario), and `cost_by_year`,
+    the chunk's discounted cost per (material, scenario, year) summed over its
+    segments, with construction in year 0.
+    """
+    materials = np.arange(len(catalog)) if materials is None else np.asarray(materials)
+    growth = scenarios['traffic_growth']
+    severity = scenarios['weather_severity']
+    years = severity.shape[1]
+    discount = (1 + discount_rate) ** -np.arange(1, years + 1)
+
+    # A segment's stress is its traffic_impact * weather_impact times a network-wide yearly factor,
+    # so costs per km depend on the segment only through that product, which takes few values
+    traffic, weather, length = _segment_arrays(segments)
+    classes, segment_class = np.unique(traffic * weather, return_inverse=True)
+    segment_class = segment_class.reshape(-1)
+    stress = classes[:, None, None] * ((1 + growth)[:, None] ** np.arange(years)[None, :] * severity)[None]
+
+    block = max(1, LIFECYCLE_CHUNK_ELEMENTS // max(1, len(classes) * len(growth) * (years + 1)))
+    for first in range(0, len(materials), block):
+        rows = slice(first, min(len(materials), first + block))
+        cost_per_km, class_resurfacings = _class_costs(catalog.properties[materials[rows]], stress, discount)
+        npc_per_km = cost_per_km.sum(axis=3)
+
+        chunk = max(1, LIFECYCLE_CHUNK_ELEMENTS // max(1, len(cost_per_km) * len(growth)))
+        for start in range(0, len(segments), chunk):
+            stop = min(len(segments), start + chunk)
+            chunk_class = segment_class[start:stop]
+            class_length = np.bincount(chunk_class, weights=length[start:stop], minlength=len(classes))
+            yield {
+                'materials': rows,
+                'segments': slice(start, stop),
+                'npc': npc_per_km[:, chunk_class] * length[start:stop][None, :, None],
+                'resurfacings': class_resurfacings[:, chunk_class],
+                'cost_by_year': np.einsum('c,mckt->mkt', class_length, cost_per_km)
+            }
+
+
+class LifecycleResult:
+    """Network-level lifecycle costs aggregated over all segment chunks."""
+
+    def __init__(self, names, materials, network_cost_by_year, best_material, best_npc, mean_resurfacings):
+        self.names = names
+        self.materials = materials
+        self.network_cost_by_year = network_cost_by_year
+        self.best_material = best_material
+        self.best_npc = best_npc
+        self.mean_resurfacings = mean_resurfacings
+
+    @property
+    def network_npc_curves(self):
+        """Cumulative discounted network cost per (material, scenario, year)."""
+        return np.cumsum(self.network_cost_by_year, axis=2)
+
+    @property
+    def network_npc(self):
+        """Net present cost of building the whole network with each material, per scenario."""
+        return self.network_cost_by_year.sum(axis=2)
+
+    def summary(self):
+        """Per-material network NPC statistics across scenarios, cheapest first."""
+        npc = self.network_npc
+        p10, p50, p90 = np.percentile(npc, [10, 50, 90], axis=1)
+        order = np.argsort(npc.mean(axis=1), kind='stable')
+        return [
+            {
+                'material': self.names[self.materials[row]],
+                'mean_npc': float(npc[row].mean()),
+                'p10_npc': float(p10[row]),
+                'median_npc': float(p50[row]),
+                'p90_npc': float(p90[row]),
+                'mean_resurfacings': float(self.mean_resurfacings[row])
+            }
+            for row in order
+        ]
+
+
+@timed()
+def simulate_lifecycle(
+    segments: Sequence[Dict[str, Any]],
+    scenarios: Dict[str, np.ndarray],
+    materials: Optional[np.ndarray] = None,
+    catalog: Optional[CompiledCatalog] = None,
+    discount_rate: float = DISCOUNT_RATE
+) -> LifecycleResult:
+    """Run iter_lifecycle over a network, keeping only network totals and each segment's cheapest material.
+
+    The result holds a (materials, scenarios, years + 1) cost array, so for a large
+    catalog pass candidate rows, such as the top k of get_recommendations, as materials.
+    """
+    if catalog is None:
+        from utils.recommendation_engine import get_active_catalog
+        catalog = get_active_catalog()
+    materials = np.arange(len(catalog)) if materials is None else np.asarray(materials)
+
+    years = scenarios['weather_severity'].shape[1]
+    network_cost_by_year = np.zeros((len(materials), len(scenarios['traffic_growth']), years + 1))
+    best_material = np.zeros(len(segments), dtype=np.int64)
+    best_npc = np.full(len(segments), np.inf)
+    resurfacing_total = np.zeros(len(materials))
+
+    for chunk in iter_lifecycle(catalog, segments, scenarios, materials, discount_rate):
+        rows, part = chunk['materials'], chunk['segments']
+        network_cost_by_year[rows] += chunk['cost_by_year']
+        expected_npc = chunk['npc'].mean(axis=2)
+        cheapest = np.argmin(expected_npc, axis=0)
+        cheapest_npc = expected_npc[cheapest, np.arange(expected_npc.shape[1])]
+        # Strictly cheaper only, so ties keep the earlier material as argmin over the whole list would
+        better = cheapest_npc < best_npc[part]
+        best_material[part] = np.where(better, materials[rows][cheapest], best_material[part])
+        best_npc[part] = np.where(better, cheapest_npc, best_npc[part])
+        resurfacing_total[rows] += chunk['resurfacings'].sum(axis=(1, 2))
+
+    samples = max(1, len(segments) * len(scenarios['traffic_growth']))
+    return LifecycleResult(
+        catalog.names, materials, network_cost_by_year, best_material, best_npc, resurfacing_total / samples
+    )
@@ -0,0 +1,276 @@
+"""Offline lookup of weather and soil conditions for a project location.
+
+Reference sites are read from a local CSV (data/locations.csv by default, or
+LOCATIONS_PATH) with one row per place or grid cell:
+
+    name,country,latitude,longitude,weather,soil_type,aliases
+
+A place name resolves to its own row; coordinates resolve to the nearest site
+within MAX_DISTANCE_KM. Sites are bucketed in a uniform 3-D grid over their
+unit vectors, so a nearest-site query visits only the cells around the query,
+and batches of points are resolved one grid cell at a time with NumPy.
+The shipped file is a coarse classification of major cities; a denser gridded
+dataset in the same columns can replace it without code changes.
+"""
+import csv
+import math
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data.materials_database import SOIL_TYPES, WEATHER_CONDITIONS
+
+LOCATIONS_PATH = os.environ.get('LOCATIONS_PATH', str(Path(__file__).parent.parent / 'data' / 'locations.csv'))
+LIST_SEPARATOR = ';'
+
+EARTH_RADIUS_KM = 6371.0
+CELL_KM = 250.0
+# Coordinates farther than this from every site resolve to nothing
+MAX_DISTANCE_KM = 750.0
+
+_COORDINATES = re.compile(r'^\s*([-+]?\d+(?:\.\d+)?)\s*[,;\s]\s*([-+]?\d+(?:\.\d+)?)\s*$')
+
+_shells: Dict[int, List[Tuple[int, int, int]]] = {}
+_location_index: Dict[str, Optional['LocationIndex']] = {'index': None}
+
+
+def _normalize(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of a place name."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', stripped.casefold()).split())
+
+
+def _shell(radius: int) -> List[Tuple[int, int, int]]:
+    """Cell offsets at Chebyshev distance exactly `radius`."""
+    if radius not in _shells:
+        span = range(-radius, radius + 1)
+        _shells[radius] = [
+            (dx, dy, dz) for dx in span for dy in span for dz in span if max(abs(dx), abs(dy), abs(dz)) == radius
+        ]
+    return _shells[radius]
+
+
+def unit_vectors(latitude, longitude) -> np.ndarray:
+    """(N, 3) unit vectors for arrays of latitudes and longitudes in degrees."""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord):
+    """Great-circle distance for a straight-line distance between unit vectors."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+class LocationIndex:
+    """Reference sites with a name index and a grid index for nearest-site queries."""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        self.names = [row['name'] for row in rows]
+        self.countries = [row['country'] for row in rows]
+        self.latitude = np.array([row['latitude'] for row in rows], dtype=np.float64)
+        self.longitude = np.array([row['longitude'] for row in rows], dtype=np.float64)
+        self.weather = [row['weather'] for row in rows]
+        self.soil_type = [row['soil_type'] for row in rows]
+        self.points = unit_vectors(self.latitude, self.longitude).reshape(-1, 3)
+        self.cell_size = CELL_KM / EARTH_RADIUS_KM
+        self.max_chord = 2 * math.sin(MAX_DISTANCE_KM / EARTH_RADIUS_KM / 2)
+        self.max_radius = int(math.ceil(self.max_chord / self.cell_size)) + 1
+
+        # 'name' and 'name, country' for every site and alias; the first site with a name wins
+        self.by_name: Dict[str, int] = {}
+        for row_index, row in enumerate(rows):
+            for name in [row['name']] + list(row.get('aliases', [])):
+                self.by_name.setdefault(_normalize(name), row_index)
+                self.by_name.setdefault(_normalize(f"{name}, {row['country']}"), row_index)
+
+        self.cells: Dict[Tuple[int, int, int], List[int]] = {}
+        for row_index, cell in enumerate(map(tuple, np.floor(self.points / self.cell_size).astype(np.int64).tolist())):
+            self.cells.setdefault(cell, []).append(row_index)
+        self.occupied = np.array(list(self.cells), dtype=np.int64).reshape(-1, 3)
+        self.point_tuples = [tuple(point) for point in self.points.tolist()]
+        self._cell_candidates: Dict[Tuple[int, int, int], Tuple[List[int], np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def find_place(self, name: str) -> Optional[int]:
+        """Site for a place name such as 'Bhopal', 'Bhopal, India' or 'Bhopal, Madhya Pradesh, India'."""
+        parts = [part for part in (_normalize(part) for part in name.split(',')) if part]
+        if not parts:
+            return None
+        for candidate in (' '.join(parts), f'{parts[0]} {parts[-1]}', parts[0]):
+            if candidate in self.by_name:
+                return self.by_name[candidate]
+        return None
+
+    def _candidates(self, cell: Tuple[int, int, int]) -> Tuple[List[int], np.ndarray]:
+        """Sites that can be nearest to some point of a grid cell, computed once per cell.
+
+        A site k shells away is within (k + 1) * sqrt(3) cells of every point in the
+        cell, and a site in shell j is at least j - 1 cells away, so the shells up to
+        (k + 1) * sqrt(3) + 1 around the first non-empty shell k hold the nearest site.
+        """
+        candidates = self._cell_candidates.get(cell)
+        if candidates is None:
+            found: List[int] = []
+            if len(self.occupied) < (2 * self.max_radius + 1) ** 3:
+                # Few occupied cells: measure the shell of every one of them at once
+                shells = np.abs(self.occupied - np.array(cell)).max(axis=1)
+                if len(shells) and shells.min() <= self.max_radius:
+                    limit = min(self.max_radius, int((shells.min() + 1) * math.sqrt(3)) + 1)
+                    for position in np.flatnonzero(shells <= limit):
+                        found.extend(self.cells[tuple(self.occupied[position].tolist())])
+            else:
+                cx, cy, cz = cell
+                limit = self.max_radius
+                radius = 0
+                while radius <= limit:
+                    for dx, dy, dz in _shell(radius):
+                        found.extend(self.cells.get((cx + dx, cy + dy, cz + dz), ()))
+                    if found and limit == self.max_radius:
+                        limit = min(self.max_radius, int((radius + 1) * math.sqrt(3)) + 1)
+                    radius += 1
+            found.sort()
+            candidates = self._cell_candidates[cell] = (found, np.array(found, dtype=np.int64))
+        return candidates
+
+    def nearest(self, latitude: float, longitude: float) -> Tuple[int, float]:
+        """Nearest site and its distance in km, or (-1, inf) when none is within MAX_DISTANCE_KM."""
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        x, y, z = math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+        size = self.cell_size
+        best, best_squared = -1, math.inf
+        for row_index in self._candidates((math.floor(x / size), math.floor(y / size), math.floor(z / size)))[0]:
+            px, py, pz = self.point_tuples[row_index]
+            squared = (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+            if squared < best_squared:
+                best, best_squared = row_index, squared
+        chord = math.sqrt(best_squared)
+        if best < 0 or chord > self.max_chord:
+            return -1, math.inf
+        return best, 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+    def nearest_batch(self, latitude, longitude) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized nearest(): site indices (-1 when out of range) and distances in km."""
+        queries = unit_vectors(latitude, longitude).reshape(-1, 3)
+        best = np.full(len(queries), -1, dtype=np.int64)
+        best_squared = np.full(len(queries), np.inf)
+        cells, group = np.unique(np.floor(queries / self.cell_size).astype(np.int64), axis=0, return_inverse=True)
+        group = group.reshape(-1)
+        order = np.argsort(group, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(group, minlength=len(cells)))])
+
+        for cell_number, cell in enumerate(map(tuple, cells.tolist())):
+            candidates = self._candidates(cell)[1]
+            if not len(candidates):
+                continue
+            members = order[bounds[cell_number]:bounds[cell_number + 1]]
+            squared = ((queries[members][:, None, :] - self.points[candidates][None, :, :]) ** 2).sum(axis=2)
+            nearest = np.argmin(squared, axis=1)
+            best[members] = candidates[nearest]
+            best_squared[members] = squared[np.arange(len(members)), nearest]
+
+        chord = np.sqrt(best_squared)
+        out_of_range = (best < 0) | (chord > self.max_chord)
+        best[out_of_range] = -1
+        distance = np.where(out_of_range, np.inf, chord_to_km(np.where(out_of_range, 0.0, chord)))
+        return best, distance
+
+    def _match(self, row_index: int, distance_km: float) -> Dict[str, Any]:
+        return {
+            'site': f'{self.names[row_index]}, {self.countries[row_index]}',
+            'latitude': float(self.latitude[row_index]),
+            'longitude': float(self.longitude[row_index]),
+            'distance_km': distance_km,
+            'weather': self.weather[row_index],
+            'soil_type': self.soil_type[row_index]
+        }
+
+    def resolve(self, query: str) -> Optional[Dict[str, Any]]:
+        """Conditions for a place name or a 'latitude, longitude' string, or None when unknown."""
+        coordinates = _COORDINATES.match(query)
+        if coordinates:
+            latitude, longitude = float(coordinates.group(1)), float(coordinates.group(2))
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return None
+            row_index, distance = self.nearest(latitude, longitude)
+            return None if row_index < 0 else self._match(row_index, distance)
+        row_index = self.find_place(query)
+        return None if row_index is None else self._match(row_index, 0.0)
+
+    def resolve_points(self, latitude, longitude) -> Dict[str, Any]:
+        """Conditions for many points at once; weather and soil_type are None beyond MAX_DISTANCE_KM."""
+        site, distance = self.nearest_batch(latitude, longitude)
+        weather = np.array(self.weather + [None], dtype=object)
+        soil_type = np.array(self.soil_type + [None], dtype=object)
+        return {
+            'site': site,
+            'distance_km': distance,
+            'weather': weather[site].tolist(),
+            'soil_type': soil_type[site].tolist()
+        }
+
+    def resolve_polyline(self, coordinates: Sequence[Tuple[float, float]], spacing_km: float = 1.0) -> Dict[str, Any]:
+        """Conditions every `spacing_km` along a route given as (latitude, longitude) vertices.
+
+        The result also holds each sample's `chainage_km` from the first vertex
+        and its `latitude` and `longitude`.
+        """
+        vertices = unit_vectors(*np.asarray(coordinates, dtype=np.float64).reshape(-1, 2).T).reshape(-1, 3)
+        if not len(vertices):
+            raise ValueError('A polyline needs at least one vertex')
+        # Great-circle length of each leg, then evenly spaced chainages along the whole route
+        legs = chord_to_km(np.linalg.norm(np.diff(vertices, axis=0), axis=1))
+        ends = np.concatenate([[0.0], np.cumsum(legs)])
+        chainage = np.arange(0.0, ends[-1], spacing_km) if ends[-1] > 0 else np.zeros(1)
+        chainage = np.append(chainage, ends[-1]) if ends[-1] > 0 else chainage
+        leg = np.clip(np.searchsorted(ends, chainage, side='right') - 1, 0, max(0, len(legs) - 1))
+        if len(legs):
+            share = np.divide(chainage - ends[leg], legs[leg], out=np.zeros_like(chainage), where=legs[leg] > 0)
+            samples = vertices[leg] + (vertices[leg + 1] - vertices[leg]) * share[:, None]
+            samples /= np.linalg.norm(samples, axis=1, keepdims=True)
+        else:
+            samples = vertices[:1]
+        latitude = np.degrees(np.arcsin(np.clip(samples[:, 2], -1, 1)))
+        longitude = np.degrees(np.arctan2(samples[:, 1], samples[:, 0]))
+        return {'chainage_km': chainage, 'latitude': latitude, 'longitude': longitude,
+                **self.resolve_points(latitude, longitude)}
+
+
+def load_locations(path: str = LOCATIONS_PATH) -> LocationIndex:
+    """Read and validate a locations CSV into a LocationIndex."""
+    rows = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, record in enumerate(csv.DictReader(f), start=2):
+            if record['weather'] not in WEATHER_CONDITIONS or record['soil_type'] not in SOIL_TYPES:
+                raise ValueError(
+                    f"{path}:{line}: unknown conditions '{record['weather']}', '{record['soil_type']}'"
+                )
+            rows.append({
+                'name': record['name'],
+                'country': record.get('country') or '',
+                'latitude': float(record['latitude']),
+                'longitude': float(record['longitude']),
+                'weather': record['weather'],
+                'soil_type': record['soil_type'],
+                'aliases': [alias.strip() for alias in (record.get('aliases') or '').split(LIST_SEPARATOR) if alias.strip()]
+            })
+    return LocationIndex(rows)
+
+
+def get_location_index() -> LocationIndex:
+    """LocationIndex for LOCATIONS_PATH, loaded once per process."""
+    if _location_index['index'] is None:
+        _location_index['index'] = load_locations()
+    return _location_index['index']
+
+
+def resolve_location(query: str) -> Optional[Dict[str, Any]]:
+    """Weather and soil conditions for a place name or coordinates, or None when unknown."""
+    return get_location_index().resolve(query)
@@ -0,0 +1,144 @@
+"""Array-backed material entries.
+
+A compiled catalog keeps numeric properties in one structured array, condition
+values as interned codes in per-field bitmasks, and names and advantages in a
+shared UTF-8 string pool. The classes here are small `__slots__` views over
+those arrays that read like the MATERIALS_DATABASE dicts, so existing code that
+does material['properties']['durability'] keeps working without any copies.
+"""
+from collections.abc import Mapping, Sequence
+from typing import Dict, List
+
+import numpy as np
+
+
+class StringPool:
+    """Deduplicated UTF-8 string pool built into offset and byte arrays."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.encoded: List[bytes] = []
+
+    def add(self, value: str) -> int:
+        if value not in self.ids:
+            self.ids[value] = len(self.encoded)
+            self.encoded.append(value.encode('utf-8'))
+        return self.ids[value]
+
+    def arrays(self):
+        lengths = np.array([len(value) for value in self.encoded], dtype=np.uint64)
+        offsets = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(lengths, dtype=np.uint64)])
+        data = np.frombuffer(b''.join(self.encoded), dtype=np.uint8)
+        return offsets, data
+
+
+class PropertiesView(Mapping):
+    """Read-only mapping of property name to value for one material."""
+
+    __slots__ = ('catalog', 'index')
+
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index = index
+
+    def __getitem__(self, field):
+        if field not in self.catalog.records.dtype.fields:
+            raise KeyError(field)
+        value = self.catalog.records[self.index][field].item()
+        return int(value) if field in self.catalog.integer_fields else value
+
+    def __iter__(self):
+        return iter(self.catalog.records.dtype.names)
+
+    def __len__(self):
+        return len(self.catalog.records.dtype.names)
+
+    def values(self):
+        return self.catalog.property_records(self.index).tolist()
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class MaterialView(Mapping):
+    """One catalog entry with the keys of a MATERIALS_DATABASE entry."""
+
+    __slots__ = ('catalog', 'index')
+
+    KEYS = ('properties', 'suitable_conditions', 'advantages')
+
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index = index
+
+    def __getitem__(self, key):
+        if key == 'properties':
+            return PropertiesView(self.catalog, self.index)
+        if key == 'advantages':
+            return self.catalog.advantages(self.index)
+        if key == 'suitable_conditions':
+            return self.catalog.suitable_conditions(self.index)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f'MaterialView({self.catalog.names[self.index]!r})'
+
+
+class MaterialEntries(Sequence):
+    """Sequence of MaterialView objects, one per catalog row, created on access."""
+
+    __slots__ = ('catalog',)
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __len__(self):
+        return len(self.catalog.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [MaterialView(self.catalog, row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return MaterialView(self.catalog, index)
+
+
+class Recommendation(Mapping):
+    """A ranked result: a catalog row plus its score, with the keys of a recommendation dict."""
+
+    __slots__ = ('catalog', 'index', 'score')
+
+    KEYS = ('material', 'score', 'properties', 'advantages')
+
+    def __init__(self, catalog, index, score):
+        self.catalog = catalog
+        self.index = index
+        self.score = score
+
+    def __getitem__(self, key):
+        if key == 'material':
+            return self.catalog.names[self.index]
+        if key == 'score':
+            return self.score
+        if key == 'properties':
+            return PropertiesView(self.catalog, self.index)
+        if key == 'advantages':
+            return self.catalog.advantages(self.index)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f'Recommendation({self.catalog.names[self.index]!r}, score={self.score!r})'
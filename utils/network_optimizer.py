@@ -0,0 +1,569 @@
+"""Budget-constrained choice of one material per road segment.
+
+Each segment is worth its material's score times its length, and costs the
+material's cost rating times CONSTRUCTION_COST_PER_RATING per km (the
+construction cost of the lifecycle model). optimize_network maximizes the
+total worth under a budget and optional per-material supply limits in km.
+
+Segments with the same conditions share their per-km scores, so the work is
+done per distinct condition tuple ("class"). Within a class only materials on
+the cost/score skyline can help, plus supply-limited materials that no
+unlimited one beats, which leaves a handful of options per class even for
+very large catalogs.
+
+The search starts from the cheapest assignment found within the supply
+limits: limited supply goes to the segments that save the most per km, a
+repair step moves segments between supplies while that lowers the cost, and
+a bounded exact search takes over when the start is still over budget.
+Infeasibility is only reported when a lower bound or that search proves it.
+
+The assignment comes from a greedy that repeatedly applies the move with the
+best score gained per unit of cost (the steps of the LP hull of a
+multiple-choice knapsack) to every segment it fits. The upper bound is the
+Lagrangian dual with multipliers on the budget (found by bisection) and on
+the supply limits (subgradient steps); the gap between the two is reported.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.advanced_calculations import get_comprehensive_scores_batch
+from utils.instrumentation import timed
+from utils.lifecycle import CONSTRUCTION_COST_PER_RATING
+from utils.scoring_engine import CONDITION_FIELDS, PROPERTY_FIELDS, CompiledCatalog
+
+DUAL_ITERATIONS = 200
+BISECTION_STEPS = 100
+
+# Limits of the exact search for a starting assignment when the greedy start does not fit
+START_SEARCH_NODES = 200_000
+START_SEARCH_SEGMENTS = 500
+# Members of a supply considered for moving out in each repair step
+REPAIR_CANDIDATES = 64
+
+
+def _class_scores(catalog: CompiledCatalog, params: Dict[str, Any], scoring: str) -> np.ndarray:
+    if scoring == 'comprehensive':
+        return get_comprehensive_scores_batch([params], catalog)['final_score'][0]
+    from utils.recommendation_engine import WEIGHT_FACTORS
+    return catalog.score(params, WEIGHT_FACTORS)
+
+
+def _cost_blocks(cost: np.ndarray, limited: np.ndarray):
+    """Unlimited materials ordered by cost (then catalog order) and the start of each equal-cost block."""
+    unlimited = np.flatnonzero(~limited)
+    order = unlimited[np.argsort(cost[unlimited], kind='stable')]
+    starts = np.flatnonzero(np.concatenate([[True], np.diff(cost[order]) != 0])) if len(order) else order
+    return order, starts
+
+
+def _class_options(scores: np.ndarray, cost: np.ndarray, limited: np.ndarray, blocks) -> np.ndarray:
+    """Materials worth considering for one class, cheapest first.
+
+    An unlimited material that costs no more and scores at least as much (the
+    earlier one on ties) can always replace any other material, so only the
+    unlimited skyline and the limited materials above it are kept.
+    """
+    order, starts = blocks
+    keep: List[int] = []
+    if len(order):
+        # Best unlimited material of every cost level, then those beating all cheaper levels
+        ordered = scores[order]
+        block_best = np.maximum.reduceat(ordered, starts)
+        block = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(order))))
+        _, first = np.unique(block[ordered == block_best[block]], return_index=True)
+        best_rows = order[np.flatnonzero(ordered == block_best[block])[first]]
+        cheaper_best = np.concatenate([[-np.inf], np.maximum.accumulate(block_best)[:-1]])
+        skyline = best_rows[block_best > cheaper_best]
+        keep = skyline.tolist()
+    else:
+        skyline = np.zeros(0, dtype=np.int64)
+    for material in np.flatnonzero(limited):
+        cheaper = skyline[cost[skyline] <= cost[material]]
+        if not len(cheaper) or scores[material] > scores[cheaper].max():
+            keep.append(material)
+    kept = np.array(keep, dtype=np.int64)
+    return kept[np.lexsort((kept, -scores[kept], cost[kept]))]
+
+
+class NetworkPlan:
+    """Material per segment chosen by optimize_network, with its totals and bound."""
+
+    def __init__(self, names, materials, lengths, scores, costs, budget, upper_bound, supply_km):
+        self.names = names
+        self.materials = materials
+        self.lengths = lengths
+        self.scores = scores
+        self.costs = costs
+        self.budget = budget
+        self.upper_bound = upper_bound
+        self.supply_km = supply_km
+
+    def __len__(self):
+        return len(self.materials)
+
+    @property
+    def total_cost(self) -> float:
+        return float(self.costs.sum())
+
+    @property
+    def total_value(self) -> float:
+        """Sum of score times length over all segments."""
+        return float((self.scores * self.lengths).sum())
+
+    @property
+    def mean_score(self) -> float:
+        """Length-weighted mean score of the chosen materials."""
+        length = self.lengths.sum()
+        return self.total_value / length if length else 0.0
+
+    @property
+    def gap(self) -> float:
+        """Relative distance from the upper bound; the optimum is at most this much better."""
+        if self.upper_bound <= 0:
+            return 0.0
+        return max(0.0, (self.upper_bound - self.total_value) / self.upper_bound)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Segments, length and cost per chosen material, longest total length first."""
+        chosen, inverse = np.unique(self.materials, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        length = np.bincount(inverse, weights=self.lengths, minlength=len(chosen))
+        cost = np.bincount(inverse, weights=self.costs, minlength=len(chosen))
+        count = np.bincount(inverse, minlength=len(chosen))
+        rows = []
+        for position in np.argsort(-length, kind='stable'):
+            name = self.names[chosen[position]]
+            rows.append({
+                'material': name,
+                'segments': int(count[position]),
+                'length_km': float(length[position]),
+                'cost': float(cost[position]),
+                'supply_km': self.supply_km.get(name)
+            })
+        return rows
+
+    def assignments(self) -> List[Dict[str, Any]]:
+        """Chosen material, score and cost for every segment, in input order."""
+        return [
+            {'material': self.names[material], 'score': float(score), 'cost': float(cost)}
+            for material, score, cost in zip(self.materials, self.scores, self.costs)
+        ]
+
+
+def _lagrangian_bound(values, costs, valid, limits, supply, class_length, budget, primal_value):
+    """Smallest Lagrangian value found over budget and supply multipliers.
+
+    values and costs are per-km (class, option) arrays where valid; limits holds
+    each option's supply-limit slot or -1.
+    """
+    slots = len(supply)
+    multipliers = np.zeros(slots)
+    finite_costs = costs[valid]
+    cost_steps = np.diff(np.unique(finite_costs))
+    best = np.inf
+
+    def choose(adjusted, price):
+        objective = np.where(valid, adjusted - price * costs, -np.inf)
+        # Ties go to the cheaper option, so the budget subgradient is as small as possible
+        objective = np.where(objective == objective.max(axis=1, keepdims=True), -costs, -np.inf)
+        return np.argmax(objective, axis=1)
+
+    for _ in range(DUAL_ITERATIONS if slots else 1):
+        penalty = np.where(limits >= 0, multipliers[np.maximum(limits, 0)], 0.0) if slots else 0.0
+        adjusted = np.where(valid, values - penalty, -np.inf)
+        rows = np.arange(len(values))
+
+        def spend(price):
+            return (class_length * costs[rows, choose(adjusted, price)]).sum()
+
+        low, high = 0.0, 0.0
+        if spend(0.0) > budget:
+            spread = np.ptp(adjusted[valid]) if valid.any() else 0.0
+            high = spread / (cost_steps.min() if len(cost_steps) else 1.0) + 1.0
+            for _ in range(BISECTION_STEPS):
+                middle = (low + high) / 2
+                if spend(middle) > budget:
+                    low = middle
+                else:
+                    high = middle
+        price = high
+        picked = choose(adjusted, price)
+        bound = (class_length * (adjusted[rows, picked] - price * costs[rows, picked])).sum() + price * budget
+        bound += (multipliers * supply).sum()
+        best = min(best, bound)
+
+        if not slots:
+            break
+        picked_slot = limits[rows, picked]
+        used = np.bincount(picked_slot[picked_slot >= 0], weights=class_length[picked_slot >= 0], minlength=slots)
+        subgradient = supply - used
+        # Multipliers already at zero cannot move down, so they do not count towards the step
+        active = (multipliers > 0) | (subgradient < 0)
+        norm = (subgradient[active] ** 2).sum()
+        if norm == 0 or best - primal_value <= 1e-9 * max(1.0, abs(best)):
+            break
+        step = (bound - primal_value) / norm
+        multipliers = np.maximum(0.0, multipliers - step * subgradient)
+    return best
+
+
+def _fallback_options(costs, valid, limits):
+    """Cheapest unlimited option of every class (-1 if none) and its cost per km (inf if none)."""
+    unlimited = valid & (limits < 0)
+    has_fallback = unlimited.any(axis=1)
+    # Options are ordered cheapest first, so the first unlimited one is the cheapest
+    fallback = np.where(has_fallback, np.argmax(unlimited, axis=1), -1)
+    fallback_cost = np.where(has_fallback, costs[np.arange(len(costs)), np.maximum(fallback, 0)], np.inf)
+    return fallback, fallback_cost
+
+
+def _cost_lower_bound(costs, valid, limits, supply, class_length, target):
+    """Lagrangian lower bound on the cost of any assignment within the supply limits.
+
+    Multipliers on the supply limits are raised by subgradient steps towards
+    `target`, the cost of the best assignment known.
+    """
+    slots = len(supply)
+    multipliers = np.zeros(slots)
+    best = -np.inf
+    rows = np.arange(len(costs))
+    for _ in range(DUAL_ITERATIONS if slots else 1):
+        penalty = np.where(limits >= 0, multipliers[np.maximum(limits, 0)], 0.0) if slots else 0.0
+        adjusted = np.where(valid, costs + penalty, np.inf)
+        picked = np.argmin(adjusted, axis=1)
+        bound = (class_length * adjusted[rows, picked]).sum() - (multipliers * supply).sum()
+        best = max(best, bound)
+        if not slots:
+            break
+        picked_slot = limits[rows, picked]
+        used = np.bincount(picked_slot[picked_slot >= 0], weights=class_length[picked_slot >= 0], minlength=slots)
+        subgradient = used - supply
+        active = (multipliers > 0) | (subgradient > 0)
+        norm = (subgradient[active] ** 2).sum()
+        if norm == 0 or target - best <= 1e-9 * max(1.0, abs(target)):
+            break
+        step = (target - bound) / norm if np.isfinite(target) else 1.0 / np.sqrt(norm)
+        multipliers = np.maximum(0.0, multipliers + step * subgradient)
+    return best
+
+
+def _refill(room, candidates, gain, lengths):
+    """Greedily pick candidate segments into `room` km, most gain per km first, shorter first on ties."""
+    picked = []
+    total = 0.0
+    for position in np.lexsort((lengths[candidates], -gain)):
+        segment = candidates[position]
+        if lengths[segment] <= room + 1e-9:
+            picked.append(segment)
+            room -= lengths[segment]
+            total += gain[position] * lengths[segment]
+    return picked, total
+
+
+def _search_start(costs, valid, limits, supply, segment_class, lengths, budget):
+    """Depth-first search for an assignment within the budget and supply limits.
+
+    Returns ((choice, remaining), False) when one is found, (None, True) when the
+    search proved there is none, and (None, False) when it gave up after
+    START_SEARCH_NODES nodes or on more than START_SEARCH_SEGMENTS open segments.
+    """
+    fallback, fallback_cost = _fallback_options(costs, valid, limits)
+    choice = fallback[segment_class].copy()
+    fixed_cost = 0.0
+    open_segments, segment_options = [], []
+    for segment in np.argsort(-lengths, kind='stable'):
+        number = segment_class[segment]
+        # Only limited options cheaper than the fallback, then the fallback, can be part of a cheapest plan
+        options = np.flatnonzero(valid[number] & (limits[number] >= 0) & (costs[number] < fallback_cost[number]))
+        if fallback[number] >= 0:
+            options = np.append(options, fallback[number])
+        if len(options) == 1 and fallback[number] >= 0:
+            fixed_cost += costs[number, fallback[number]] * lengths[segment]
+            continue
+        open_segments.append(segment)
+        segment_options.append(options)
+    if len(open_segments) > START_SEARCH_SEGMENTS:
+        return None, False
+    cheapest = [costs[segment_class[segment], options].min() * lengths[segment]
+                for segment, options in zip(open_segments, segment_options)]
+    still_needed = np.concatenate([np.cumsum(cheapest[::-1])[::-1], [0.0]])
+    remaining = supply.copy()
+    nodes = [0]
+
+    def place(position, spent):
+        nodes[0] += 1
+        if nodes[0] > START_SEARCH_NODES or spent + still_needed[position] > budget + 1e-9:
+            return False
+        if position == len(open_segments):
+            return True
+        segment = open_segments[position]
+        number = segment_class[segment]
+        for option in segment_options[position]:
+            slot = limits[number, option]
+            if slot >= 0 and remaining[slot] < lengths[segment] - 1e-9:
+                continue
+            if slot >= 0:
+                remaining[slot] -= lengths[segment]
+            if place(position + 1, spent + costs[number, option] * lengths[segment]):
+                choice[segment] = option
+                return True
+            if slot >= 0:
+                remaining[slot] += lengths[segment]
+        return False
+
+    if place(0, fixed_cost):
+        return (choice, remaining), False
+    return None, nodes[0] <= START_SEARCH_NODES
+
+
+def _cheapest_start(costs, valid, limits, supply, segment_class, lengths, budget):
+    """Option per segment with the lowest total cost found within the supply limits, and the supply left.
+
+    Limited supply goes first to the segments that save the most per km against
+    their class's cheapest unlimited option. While the start is over budget, or
+    leaves segments without a material, a repair step moves one segment out of a
+    supply and refills the freed km, as long as that lowers the cost. Raises
+    ValueError saying whether no start exists or none was found.
+    """
+    fallback, fallback_cost = _fallback_options(costs, valid, limits)
+    # Segments with no unlimited option and no supply left are charged a penalty above any real cost
+    penalty = 2 * costs[valid].max() + 1.0
+    base_cost = np.where(np.isfinite(fallback_cost), fallback_cost, penalty)[segment_class]
+    choice = fallback[segment_class].copy()
+    remaining = supply.copy()
+
+    # Every (segment, limited option) pair that is cheaper than the segment's fallback
+    members = np.argsort(segment_class, kind='stable')
+    bounds = np.searchsorted(segment_class[members], np.arange(len(costs) + 1))
+    cheaper = valid & (limits >= 0) & (costs < np.where(np.isfinite(fallback_cost), fallback_cost, penalty)[:, None])
+    pair_segment, pair_option = [], []
+    for number, option in zip(*np.nonzero(cheaper)):
+        in_class = members[bounds[number]:bounds[number + 1]]
+        pair_segment.append(in_class)
+        pair_option.append(np.full(len(in_class), option))
+    pair_segment = np.concatenate(pair_segment) if pair_segment else np.zeros(0, dtype=np.int64)
+    pair_option = np.concatenate(pair_option) if pair_option else np.zeros(0, dtype=np.int64)
+    pair_slot = limits[segment_class[pair_segment], pair_option]
+    pair_cost = costs[segment_class[pair_segment], pair_option]
+
+    def per_km(segments):
+        chosen = choice[segments]
+        return np.where(chosen >= 0, costs[segment_class[segments], np.maximum(chosen, 0)], penalty)
+
+    def chosen_slot(segments):
+        chosen = choice[segments]
+        return np.where(chosen >= 0, limits[segment_class[segments], np.maximum(chosen, 0)], -1)
+
+    everyone = np.arange(len(lengths))
+    for pair in np.lexsort((lengths[pair_segment], pair_cost - base_cost[pair_segment])):
+        segment, slot = pair_segment[pair], pair_slot[pair]
+        if chosen_slot(segment) < 0 and remaining[slot] >= lengths[segment] - 1e-9:
+            choice[segment] = pair_option[pair]
+            remaining[slot] -= lengths[segment]
+
+    total = (lengths * per_km(everyone)).sum()
+    class_length = np.bincount(segment_class, weights=lengths, minlength=len(costs))
+    if total > budget + 1e-9:
+        lower = _cost_lower_bound(costs, valid, limits, supply, class_length, total)
+        if lower > budget + 1e-9:
+            raise ValueError(f'Budget {budget:,.0f} is below the cheapest assignment (at least {lower:,.0f})')
+    improved = True
+    while improved and (total > budget + 1e-9 or (choice < 0).any()):
+        improved = False
+        for slot in range(len(supply)):
+            in_slot = np.flatnonzero(chosen_slot(everyone) == slot)
+            offers = np.flatnonzero(pair_slot == slot)
+            outside = offers[~np.isin(pair_segment[offers], in_slot)]
+            if not len(outside):
+                continue
+            candidates = pair_segment[outside]
+            gain = per_km(candidates) - pair_cost[outside]
+            useful = gain > 1e-12
+            outside, candidates, gain = outside[useful], candidates[useful], gain[useful]
+            if not len(outside):
+                continue
+            # Leave the slot as it is, or move one member to its cheapest other option with room, then refill
+            best_change, best_move = 1e-9, None
+            # Members that save least per km where they are are the cheapest to move
+            in_slot = in_slot[np.argsort(per_km(in_slot) - base_cost[in_slot], kind='stable')[::-1][:REPAIR_CANDIDATES]]
+            for ejected in [None] + in_slot.tolist():
+                room = remaining[slot]
+                loss, target = 0.0, -1
+                if ejected is not None:
+                    number = segment_class[ejected]
+                    fits = valid[number] & (limits[number] != slot) & (
+                        (limits[number] < 0) | (remaining[np.maximum(limits[number], 0)] >= lengths[ejected] - 1e-9)
+                    )
+                    target = int(np.argmax(np.where(fits, -costs[number], -np.inf))) if fits.any() else -1
+                    moved_cost = costs[number, target] if target >= 0 else penalty
+                    room += lengths[ejected]
+                    loss = (moved_cost - per_km(ejected)) * lengths[ejected]
+                picked, saved = _refill(room, candidates, gain, lengths)
+                if saved - loss > best_change:
+                    best_change, best_move = saved - loss, (ejected, target, picked)
+            if best_move is None:
+                continue
+            ejected, target, picked = best_move
+            if ejected is not None:
+                choice[ejected] = target
+                remaining[slot] += lengths[ejected]
+                if target >= 0 and limits[segment_class[ejected], target] >= 0:
+                    remaining[limits[segment_class[ejected], target]] -= lengths[ejected]
+            for segment in picked:
+                previous = chosen_slot(segment)
+                if previous >= 0:
+                    remaining[previous] += lengths[segment]
+                choice[segment] = pair_option[outside[np.flatnonzero(candidates == segment)[0]]]
+                remaining[slot] -= lengths[segment]
+            total = (lengths * per_km(everyone)).sum()
+            improved = True
+
+    if total > budget + 1e-9 or (choice < 0).any():
+        found, exhausted = _search_start(costs, valid, limits, supply, segment_class, lengths, budget)
+        if found is not None:
+            return found
+        if exhausted:
+            # Without a start within the supply limits, the budget is only proven short once one exists
+            within_supply, supply_exhausted = (choice, True) if not (choice < 0).any() else _search_start(
+                costs, valid, limits, supply, segment_class, lengths, np.inf
+            )
+            if within_supply is None and supply_exhausted:
+                raise ValueError('Supply limits leave no material for some segments')
+            if within_supply is not None:
+                raise ValueError(f'Budget {budget:,.0f} is below the cheapest assignment within the supply limits')
+
+    if (choice < 0).any():
+        # Proven when segments without an unlimited option need more km than all supplies hold,
+        # or one of them is longer than every supply it could use
+        bound_to_supply = ~np.isfinite(fallback_cost)[segment_class]
+        largest_supply = np.where(valid & (limits >= 0), supply[np.maximum(limits, 0)], 0.0).max(axis=1)
+        if lengths[bound_to_supply].sum() > supply.sum() + 1e-9 or (
+            lengths[bound_to_supply] > largest_supply[segment_class[bound_to_supply]] + 1e-9
+        ).any():
+            raise ValueError('Supply limits leave no material for some segments')
+        raise ValueError('No assignment within the supply limits was found')
+    if total > budget + 1e-9:
+        raise ValueError(
+            f'No assignment within budget {budget:,.0f} was found; the cheapest found costs {total:,.0f}'
+        )
+    return choice, remaining
+
+
+@timed()
+def optimize_network(
+    segments: Sequence[Dict[str, Any]],
+    budget: float,
+    supply_km: Optional[Dict[str, float]] = None,
+    scoring: str = 'suitability',
+    catalog: Optional[CompiledCatalog] = None
+) -> NetworkPlan:
+    """Choose one material per segment to maximize total score x length within a budget.
+
+    Segments carry the condition fields and a length_km (default 1). supply_km
+    caps the total length built with the named materials. Raises ValueError
+    when no assignment within the budget and supply limits is found, saying
+    whether none exists.
+    """
+    from utils.recommendation_engine import _check_scoring, get_active_catalog
+
+    _check_scoring(scoring)
+    if catalog is None:
+        catalog = get_active_catalog()
+    supply_km = dict(supply_km or {})
+    unknown = [name for name in supply_km if name not in catalog.names]
+    if unknown:
+        raise ValueError(f"Unknown materials in supply limits: {', '.join(unknown)}")
+    if not len(segments):
+        return NetworkPlan(catalog.names, np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), np.zeros(0),
+                           budget, 0.0, supply_km)
+
+    material_cost = catalog.properties[:, PROPERTY_FIELDS.index('cost')] * CONSTRUCTION_COST_PER_RATING
+    limited_names = list(supply_km)
+    limited = np.zeros(len(catalog), dtype=bool)
+    slot_of = np.full(len(catalog), -1, dtype=np.int64)
+    for slot, name in enumerate(limited_names):
+        material = catalog.names.index(name)
+        limited[material] = True
+        slot_of[material] = slot
+    supply = np.array([float(supply_km[name]) for name in limited_names])
+    blocks = _cost_blocks(material_cost, limited)
+
+    # Distinct condition tuples, each scored once over the catalog and reduced to its options
+    keys = [tuple(segment[field] for field in CONDITION_FIELDS) for segment in segments]
+    classes = list(dict.fromkeys(keys))
+    class_of = {key: number for number, key in enumerate(classes)}
+    segment_class = np.array([class_of[key] for key in keys], dtype=np.int64)
+    lengths = np.array([float(segment.get('length_km', 1.0)) for segment in segments])
+
+    options = []
+    option_values = []
+    for key in classes:
+        scores = _class_scores(catalog, dict(zip(CONDITION_FIELDS, key)), scoring)
+        kept = _class_options(scores, material_cost, limited, blocks)
+        options.append(kept)
+        option_values.append(scores[kept])
+    width = max(len(kept) for kept in options)
+    material = np.full((len(classes), width), -1, dtype=np.int64)
+    values = np.zeros((len(classes), width))
+    for number, kept in enumerate(options):
+        material[number, :len(kept)] = kept
+        values[number, :len(kept)] = option_values[number]
+    valid = material >= 0
+    costs = np.where(valid, material_cost[np.maximum(material, 0)], 0.0)
+    limits = np.where(valid, slot_of[np.maximum(material, 0)], -1)
+
+    # Start from the cheapest assignment that can be found within the supply limits
+    choice, remaining = _cheapest_start(costs, valid, limits, supply, segment_class, lengths, budget)
+    left = budget - (lengths * costs[segment_class, choice]).sum()
+
+    # Greedy: apply the class-level move with the most score per unit of cost to every segment it fits
+    gain = values[:, None, :] - values[:, :, None]  # (class, from, to)
+    extra = costs[:, None, :] - costs[:, :, None]
+    improving = valid[:, :, None] & valid[:, None, :] & (gain > 0)
+    ratio = np.where(improving, np.where(extra > 0, gain / np.where(extra > 0, extra, 1.0), np.inf), -np.inf)
+    move_order = np.lexsort((-np.where(improving, gain, 0).ravel(), -ratio.ravel()))
+    move_order = move_order[improving.ravel()[move_order]]
+    move_class, move_source, move_target = np.unravel_index(move_order, gain.shape)
+    move_group = move_class * width + move_source
+    move_extra = np.maximum(extra[move_class, move_source, move_target], 0.0)
+    move_slot = limits[move_class, move_target]
+    while len(move_order):
+        groups = segment_class * width + choice
+        shortest = np.full(len(classes) * width, np.inf)
+        np.minimum.at(shortest, groups, lengths)
+        # A move can be applied when the shortest segment it would move fits the budget and supply
+        occupied = np.isfinite(shortest[move_group])
+        smallest = np.where(occupied, shortest[move_group], 0.0)
+        fits = occupied & (smallest * move_extra <= left + 1e-9)
+        fits &= np.append(remaining, np.inf)[move_slot] >= smallest  # slot -1 is unlimited
+        if not fits.any():
+            break
+        move = np.argmax(fits)
+        number, source, target, slot = move_class[move], move_source[move], move_target[move], move_slot[move]
+        members = np.flatnonzero(groups == move_group[move])
+        for segment in members[np.argsort(-lengths[members], kind='stable')]:
+            spent = lengths[segment] * extra[number, source, target]
+            if spent > left + 1e-9 or (slot >= 0 and remaining[slot] < lengths[segment]):
+                continue
+            left -= spent
+            previous = limits[number, source]
+            if previous >= 0:
+                remaining[previous] += lengths[segment]
+            if slot >= 0:
+                remaining[slot] -= lengths[segment]
+            choice[segment] = target
+
+    chosen_value = (lengths * values[segment_class, choice]).sum()
+    class_length = np.bincount(segment_class, weights=lengths, minlength=len(classes))
+    upper_bound = _lagrangian_bound(values, costs, valid, limits, supply, class_length, budget, chosen_value)
+    return NetworkPlan(
+        catalog.names,
+        material[segment_class, choice],
+        lengths,
+        values[segment_class, choice],
+        lengths * costs[segment_class, choice],
+        budget,
+        max(float(upper_bound), float(chosen_value)),
+        supply_km
+    )
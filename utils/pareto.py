@@ -0,0 +1,147 @@
+import numpy as np
+from typing import Any, Dict, Optional
+
+from utils.instrumentation import timed
+from utils.scoring_engine import CONDITION_FIELDS, PROPERTY_FIELDS, CompiledCatalog
+
+# +1 for properties where higher is better, -1 where lower is better (as in advanced_calculations)
+OBJECTIVES = {
+    'durability': 1,
+    'cost': -1,
+    'weather_resistance': 1,
+    'load_capacity': 1,
+    'maintenance': -1
+}
+
+# Largest dominance grid (product of distinct values per objective) counted by prefix sums
+GRID_CELL_LIMIT = 1 << 24
+
+# Block fallback compares COMPARE_BLOCK points against COMPARE_WIDTH candidates at a time
+COMPARE_BLOCK = 1024
+COMPARE_WIDTH = 1 << 15
+
+
+def _grid_dominance_counts(codes: np.ndarray, shape) -> np.ndarray:
+    """Dominated-by counts from a histogram over the value grid and a suffix sum along every axis."""
+    cells = np.ravel_multi_index(codes.T, shape)
+    histogram = np.bincount(cells, minlength=int(np.prod(shape))).reshape(shape)
+    at_least = histogram
+    for axis in range(len(shape)):
+        at_least = np.flip(np.cumsum(np.flip(at_least, axis), axis=axis), axis)
+    # Points >= in every objective, minus the point itself and its exact duplicates
+    return at_least.ravel()[cells] - histogram.ravel()[cells]
+
+
+def _block_dominance_counts(points: np.ndarray) -> np.ndarray:
+    """Dominated-by counts by comparing blocks of points against every point with a larger sum."""
+    order = np.argsort(-points.sum(axis=1), kind='stable')
+    ordered = np.ascontiguousarray(points[order].T)
+    sums = ordered.sum(axis=0)
+    # Counting points that are >= everywhere includes each point's exact duplicates (and itself)
+    _, duplicates, copies = np.unique(points[order], axis=0, return_inverse=True, return_counts=True)
+    counts = np.zeros(len(points), dtype=np.int64)
+    for start in range(0, len(sums), COMPARE_BLOCK):
+        stop = min(len(sums), start + COMPARE_BLOCK)
+        # A dominating point has a larger sum, so it sorts no later than the block's smallest sum
+        limit = np.searchsorted(-sums, -sums[stop - 1], side='right')
+        found = -copies[duplicates.reshape(-1)[start:stop]]
+        for offset in range(0, limit, COMPARE_WIDTH):
+            end = min(limit, offset + COMPARE_WIDTH)
+            at_least = np.ones((stop - start, end - offset), dtype=bool)
+            for column in ordered:
+                at_least &= column[None, offset:end] >= column[start:stop, None]
+            found += at_least.sum(axis=1)
+        counts[order[start:stop]] = found
+    return counts
+
+
+def dominance_counts(points: np.ndarray) -> np.ndarray:
+    """For each row, how many rows are at least as good in every column and better in one.
+
+    Columns are coordinate-compressed; when the grid of distinct values is small
+    enough (always, for the 0-10 property ratings) the counts come from one
+    histogram and a cumulative sum per axis, linear in the number of points.
+    Otherwise rows are compared block-wise in descending order of their sum.
+    """
+    if not len(points):
+        return np.zeros(0, dtype=np.int64)
+    codes = []
+    shape = []
+    for column in points.T:
+        values, code = np.unique(column, return_inverse=True)
+        codes.append(code.reshape(-1))
+        shape.append(len(values))
+    if np.prod(shape, dtype=np.float64) <= GRID_CELL_LIMIT:
+        return _grid_dominance_counts(np.column_stack(codes), tuple(shape))
+    return _block_dominance_counts(points)
+
+
+class ParetoFront:
+    """Dominance analysis of the materials that satisfy a set of conditions."""
+
+    def __init__(self, names, entries, candidates, properties, dominated_by, conditions_met):
+        self.conditions_met = conditions_met
+        self.names = names
+        self.entries = entries
+        self.candidates = candidates
+        self.properties = properties
+        self.dominated_by = dominated_by
+
+    def __len__(self):
+        return len(self.candidates)
+
+    @property
+    def front(self):
+        """Catalog indices of the non-dominated materials, in catalog order."""
+        return self.candidates[self.dominated_by == 0]
+
+    def materials(self, limit=None):
+        """Materials ordered by dominated-by count, each in the form used by get_recommendations."""
+        order = np.argsort(self.dominated_by, kind='stable')[:limit]
+        results = []
+        for position in order:
+            index = self.candidates[position]
+            entry = self.entries[index]
+            results.append({
+                'material': self.names[index],
+                'dominated_by': int(self.dominated_by[position]),
+                'pareto_optimal': bool(self.dominated_by[position] == 0),
+                'properties': entry['properties'],
+                'advantages': entry['advantages']
+            })
+        return results
+
+    def to_frame(self, limit=None):
+        """DataFrame of the candidate materials, non-dominated first."""
+        import pandas as pd
+
+        order = np.argsort(self.dominated_by, kind='stable')[:limit]
+        frame = pd.DataFrame(self.properties[order], columns=list(PROPERTY_FIELDS))
+        frame.insert(0, 'material', [self.names[index] for index in self.candidates[order]])
+        frame['dominated_by'] = self.dominated_by[order]
+        frame['pareto_optimal'] = self.dominated_by[order] == 0
+        return frame
+
+
+@timed()
+def pareto_front(params: Optional[Dict[str, Any]] = None, catalog: Optional[CompiledCatalog] = None) -> ParetoFront:
+    """Pareto analysis over the properties of the materials matching the conditions in params.
+
+    When no material satisfies every condition, the materials satisfying the most
+    conditions are compared instead; `conditions_met` records how many that was.
+    """
+    if catalog is None:
+        from utils.recommendation_engine import get_active_catalog
+        catalog = get_active_catalog()
+
+    matched = np.zeros(len(catalog), dtype=np.int8)
+    for field in CONDITION_FIELDS:
+        if params and field in params:
+            matched += catalog.condition_matches(field, params[field])
+    conditions_met = int(matched.max()) if len(matched) else 0
+    candidates = np.flatnonzero(matched == conditions_met)
+
+    properties = catalog.properties[candidates]
+    signs = np.array([OBJECTIVES[field] for field in PROPERTY_FIELDS], dtype=np.float64)
+    dominated_by = dominance_counts(properties * signs)
+    return ParetoFront(catalog.names, catalog.entries, candidates, properties, dominated_by, conditions_met)
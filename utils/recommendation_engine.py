@@ -1,15 +1,31 @@
+import os
+from numbers import Integral
+
 import numpy as np
 from data.materials_database import MATERIALS_DATABASE
+from utils.advanced_calculations import get_comprehensive_scores_batch
+from utils.condition_index import ConditionIndex, bits_to_indices
+from utils.instrumentation import timed
+from utils.material_store import Recommendation
+from utils.scoring_engine import CONDITION_FIELDS, AnswerTable, IncrementalScorer, get_compiled_catalog, top_k_indices
+
+# Optional external catalog (compiled file, or JSON/CSV/SQLite source) replacing MATERIALS_DATABASE
+CATALOG_PATH = os.environ.get('MATERIALS_CATALOG_PATH')
+
+# Ranking modes: the additive suitability score, or get_comprehensive_score's final_score
+SCORING_MODES = ('suitability', 'comprehensive')
+
+WEIGHT_FACTORS = {
+    'traffic_load': 0.35,
+    'weather': 0.25,
+    'soil_type': 0.25,
+    'durability': 0.15
+}
 
 def calculate_material_score(material_properties, params):
     """Calculate material suitability score based on input parameters."""
     score = 0
-    weight_factors = {
-        'traffic_load': 0.35,
-        'weather': 0.25,
-        'soil_type': 0.25,
-        'durability': 0.15
-    }
+    weight_factors = WEIGHT_FACTORS
 
     # Traffic load compatibility
     if params['traffic_load'] in material_properties['suitable_conditions']['traffic_load']:
@@ -36,19 +52,222 @@ def calculate_material_score(material_properties, params):
 
     return score
 
-def get_recommendations(params):
-    """Get material recommendations based on input parameters."""
-    recommendations = []
-
-    for material, properties in MATERIALS_DATABASE.items():
-        score = calculate_material_score(properties, params)
-        recommendations.append({
-            'material': material,
-            'score': score,
-            'properties': properties['properties'],
-            'advantages': properties['advantages']
+_catalog_watcher = {'watcher': None}
+
+def get_active_catalog():
+    """Compiled catalog in use: the external catalog file when configured, else MATERIALS_DATABASE.
+
+    The external file is memory-mapped and reloaded when its mtime changes.
+    """
+    if CATALOG_PATH:
+        if _catalog_watcher['watcher'] is None:
+            from utils.catalog_loader import CatalogWatcher
+            _catalog_watcher['watcher'] = CatalogWatcher(CATALOG_PATH)
+        return _catalog_watcher['watcher'].current()
+    return get_compiled_catalog(MATERIALS_DATABASE)
+
+_answer_table_cache = {'table': None}
+
+def get_answer_table(catalog=None):
+    """Answer table for the current catalog and weights, rebuilt when the catalog contents or weights change."""
+    if catalog is None:
+        catalog = get_active_catalog()
+    table = _answer_table_cache['table']
+    if table is None or not table.is_current(catalog, WEIGHT_FACTORS):
+        table = _answer_table_cache['table'] = AnswerTable(catalog, WEIGHT_FACTORS)
+    return table
+
+def build_answer_table():
+    """Precompute the top rankings for every known traffic/weather/soil combination."""
+    return get_answer_table().build()
+
+def get_incremental_scorer(scorer=None, catalog=None):
+    """Return scorer if it still matches the current catalog and weights, else a new one.
+
+    Meant to be kept per user session and passed back on every call.
+    """
+    if catalog is None:
+        catalog = get_active_catalog()
+    if scorer is None or not scorer.is_current(catalog, WEIGHT_FACTORS):
+        scorer = IncrementalScorer(catalog, WEIGHT_FACTORS)
+    return scorer
+
+_condition_index_cache = {'catalog': None, 'index': None}
+
+def get_condition_index(catalog=None):
+    """Inverted condition index for the current catalog, rebuilt when the catalog changes."""
+    if catalog is None:
+        catalog = get_active_catalog()
+    if _condition_index_cache['catalog'] is not catalog:
+        _condition_index_cache['index'] = ConditionIndex.from_catalog(catalog)
+        _condition_index_cache['catalog'] = catalog
+    return _condition_index_cache['index']
+
+def _select_top_k_candidates(catalog, params, top_k):
+    """Rows that can reach the top k, found by walking compatibility groups best first.
+
+    A group is skipped once its best possible score falls strictly below the
+    guaranteed k-th score of the groups already taken, so ties are never lost.
+    """
+    property_term = catalog.property_score * WEIGHT_FACTORS['durability']
+    if not len(property_term):
+        return np.empty(0, dtype=np.intp)
+    best_property, worst_property = property_term.max(), property_term.min()
+
+    groups = []
+    for fields, bits in get_condition_index(catalog).groups(params).items():
+        condition_score = 0
+        for field in CONDITION_FIELDS:
+            if field in fields:
+                condition_score += 100 * WEIGHT_FACTORS[field]
+        groups.append((condition_score, bits))
+    groups.sort(key=lambda group: group[0], reverse=True)
+
+    selected_bits = 0
+    selected_count = 0
+    floor = np.inf
+    for condition_score, bits in groups:
+        if selected_count >= top_k and condition_score + best_property < floor:
+            break
+        selected_bits |= bits
+        selected_count += bin(bits).count('1')
+        floor = condition_score + worst_property
+    return bits_to_indices(selected_bits)
+
+def _check_scoring(scoring):
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode '{scoring}'; expected one of {SCORING_MODES}")
+
+def _check_top_k(top_k):
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, Integral) or top_k < 0):
+        raise ValueError(f'top_k must be None or a non-negative integer, got {top_k!r}')
+
+@timed()
+def get_recommendations(params, use_answer_table=True, top_k=None, scoring='suitability', scorer=None):
+    """Get material recommendations based on input parameters.
+
+    With top_k set, only the k best materials are selected and returned.
+    scoring='comprehensive' ranks by the final score of get_comprehensive_score instead.
+    A scorer from get_incremental_scorer re-scores only the fields changed since its last call;
+    it is used when the answer table has no entry for params.
+    """
+    _check_scoring(scoring)
+    _check_top_k(top_k)
+    catalog = get_active_catalog()
+
+    answer = None
+    if use_answer_table and scoring == 'suitability':
+        answer = get_answer_table(catalog).lookup(params, top_k)
+
+    if scoring == 'comprehensive':
+        scores = get_comprehensive_scores_batch([params], catalog)['final_score'][0]
+        ranking = top_k_indices(scores, top_k)
+        ranked_scores = scores[ranking]
+    elif answer is not None:
+        ranking, ranked_scores = answer
+    elif scorer is not None:
+        if not scorer.is_current(catalog, WEIGHT_FACTORS):
+            raise ValueError('scorer is stale; refresh it with get_incremental_scorer()')
+        ranking, ranked_scores = scorer.top_k(params, top_k)
+    elif top_k is not None and top_k < len(catalog):
+        # Only materials from compatibility groups that can still reach the top k are scored
+        rows = _select_top_k_candidates(catalog, params, top_k)
+        scores = catalog.score(params, WEIGHT_FACTORS, rows=rows)
+        selected = top_k_indices(scores, top_k)
+        ranking, ranked_scores = rows[selected], scores[selected]
+    else:
+        scores = catalog.score(params, WEIGHT_FACTORS)
+        ranking = top_k_indices(scores, top_k)
+        ranked_scores = scores[ranking]
+
+    # Views over the catalog arrays; nothing is copied per material
+    return [Recommendation(catalog, index, score) for index, score in zip(ranking, ranked_scores)]
+
+class BatchRecommendations:
+    """Ranked results for many parameter sets, held as arrays instead of per-material dicts.
+
+    Identical parameter sets share one ranking row; `ranking` and `scores` expand
+    them to one row per input parameter set on access.
+    """
+
+    def __init__(self, materials, unique_ranking, unique_scores, inverse, catalog=None):
+        self.materials = materials
+        self.unique_ranking = unique_ranking
+        self.unique_scores = unique_scores
+        self.inverse = inverse
+        self.catalog = catalog
+
+    def __len__(self):
+        return len(self.inverse)
+
+    @property
+    def ranking(self):
+        """Material indices ordered best first, shape (params, materials)."""
+        return self.unique_ranking[self.inverse]
+
+    @property
+    def scores(self):
+        """Scores aligned with `ranking`, shape (params, materials)."""
+        return self.unique_scores[self.inverse]
+
+    def best_materials(self):
+        """Name of the top material for each parameter set."""
+        if not self.materials or not self.unique_ranking.shape[1]:
+            return [None] * len(self)
+        names = np.asarray(self.materials, dtype=object)
+        return list(names[self.unique_ranking[:, 0]][self.inverse])
+
+    def recommendations(self, index):
+        """Results for one parameter set, in the same form as get_recommendations."""
+        row = self.inverse[index]
+        return [
+            Recommendation(self.catalog, material, score)
+            for material, score in zip(self.unique_ranking[row], self.unique_scores[row])
+        ]
+
+    def to_frame(self, top_k=None):
+        """Long-format DataFrame with one row per (parameter set, rank)."""
+        import pandas as pd
+
+        ranking = self.unique_ranking[:, :top_k]
+        scores = self.unique_scores[:, :top_k]
+        width = ranking.shape[1]
+        rows = np.repeat(np.arange(len(self)), width)
+        ranked = ranking[self.inverse].ravel()
+        return pd.DataFrame({
+            'param_index': rows,
+            'rank': np.tile(np.arange(1, width + 1), len(self)),
+            'material': pd.Categorical.from_codes(ranked, categories=self.materials),
+            'score': scores[self.inverse].ravel()
         })
 
-    # Sort by score
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
-    return recommendations
\ No newline at end of file
+@timed()
+def get_recommendations_batch(params_list, top_k=None, scoring='suitability'):
+    """Score many parameter sets against the whole catalog in one 2-D computation.
+
+    With top_k set, each parameter set keeps only its k best materials.
+    """
+    _check_scoring(scoring)
+    _check_top_k(top_k)
+    catalog = get_active_catalog()
+    encoded = catalog.encode_params(params_list)
+    if len(encoded):
+        unique_params, first, inverse = np.unique(encoded, axis=0, return_index=True, return_inverse=True)
+    else:
+        unique_params, first, inverse = encoded, [], np.zeros(0, dtype=np.intp)
+
+    if scoring == 'comprehensive':
+        # Parameter sets with equal encodings also share every comprehensive factor
+        representatives = [params_list[i] for i in first]
+        scores = get_comprehensive_scores_batch(representatives, catalog)['final_score']
+    else:
+        scores = catalog.score_encoded(unique_params, WEIGHT_FACTORS)
+    if top_k is None or top_k >= len(catalog):
+        # Stable sort keeps catalog order for equal scores
+        ranking = np.argsort(-scores, axis=1, kind='stable')
+    else:
+        ranking = np.array([top_k_indices(row, top_k) for row in scores], dtype=np.intp)
+        ranking = ranking.reshape(len(scores), top_k)
+    ranked_scores = np.take_along_axis(scores, ranking, axis=1)
+
+    return BatchRecommendations(catalog.names, ranking, ranked_scores, inverse.reshape(-1), catalog)
@@ -0,0 +1,172 @@
+"""Process-wide cache of rendered recommendation results.
+
+Entries are JSON documents (ranked results, serialized Plotly figures) keyed on
+the scoring-relevant parameters plus the catalog's content version and the
+weights, so a catalog reload or a weight change never serves stale results.
+The in-memory tier is an LRU bounded by the total size of the stored JSON;
+an optional SQLite file keeps entries across restarts, dropping the oldest
+rows once it holds more than its own byte budget.
+
+    RESULT_CACHE_MB=64 RESULT_CACHE_PATH=results.sqlite RESULT_CACHE_DISK_MB=256 streamlit run main.py
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from utils.scoring_engine import CONDITION_FIELDS, CompiledCatalog
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+
+def cache_key(
+    params: Dict[str, Any],
+    catalog: CompiledCatalog,
+    weight_factors: Dict[str, float],
+    **options: Any
+) -> str:
+    """Key for a result: the condition fields of params (location does not affect scores),
+    the catalog version, the weights and any extra options such as scoring mode or top_k."""
+    document = {
+        'params': {field: params[field] for field in CONDITION_FIELDS},
+        'catalog': catalog.version,
+        'weights': weight_factors,
+        'options': options
+    }
+    return hashlib.blake2b(json.dumps(document, sort_keys=True).encode('utf-8'), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU of JSON documents with a byte budget and an optional SQLite tier."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        path: Optional[str] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES
+    ):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.path = path
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self._disk_bytes = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)')
+            self._disk_bytes = self._db.execute('SELECT COALESCE(SUM(LENGTH(value)), 0) FROM results').fetchone()[0]
+            self._prune_disk()
+            self._db.commit()
+
+    def _remember(self, key: str, payload: bytes) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        if len(payload) > self.max_bytes:
+            return
+        self._entries[key] = payload
+        self._bytes += len(payload)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _prune_disk(self) -> None:
+        """Delete the oldest stored rows until the SQLite tier fits its byte budget."""
+        excess = self._disk_bytes - self.max_disk_bytes
+        if excess <= 0:
+            return
+        expired = []
+        for key, size in self._db.execute('SELECT key, LENGTH(value) FROM results ORDER BY stored_at'):
+            expired.append((key,))
+            excess -= size
+            self._disk_bytes -= size
+            if excess <= 0:
+                break
+        self._db.executemany('DELETE FROM results WHERE key = ?', expired)
+        self.disk_evictions += len(expired)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached document for key, or None; a disk hit is promoted into memory."""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(payload)
+            if self._db is not None:
+                row = self._db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    payload = bytes(row[0])
+                    self._remember(key, payload)
+                    self.disk_hits += 1
+                    return json.loads(payload)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable document in memory and, when configured, on disk."""
+        payload = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self._remember(key, payload)
+            if self._db is not None:
+                previous = self._db.execute('SELECT LENGTH(value) FROM results WHERE key = ?', (key,)).fetchone()
+                self._db.execute(
+                    'INSERT OR REPLACE INTO results (key, value, stored_at) VALUES (?, ?, ?)',
+                    (key, payload, time.time())
+                )
+                self._disk_bytes += len(payload) - (previous[0] if previous else 0)
+                self._prune_disk()
+                self._db.commit()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self, disk: bool = False) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if disk and self._db is not None:
+                self._db.execute('DELETE FROM results')
+                self._db.commit()
+                self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current memory use."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'disk_bytes': self._disk_bytes,
+                'disk_evictions': self.disk_evictions
+            }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
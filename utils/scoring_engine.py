@@ -0,0 +1,474 @@
+import hashlib
+import pickle
+import threading
+import time
+
+import numpy as np
+from itertools import product
+from numbers import Integral
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from data.materials_database import TRAFFIC_LOADS, WEATHER_CONDITIONS, SOIL_TYPES
+from utils.material_store import MaterialEntries, StringPool
+
+PROPERTY_FIELDS = ('durability', 'cost', 'weather_resistance', 'load_capacity', 'maintenance')
+
+# One record per material over the rows of the property matrix
+PROPERTY_DTYPE = np.dtype([(field, np.float64) for field in PROPERTY_FIELDS])
+
+# Properties are scored as float64; fields whose source values are all integers read back as ints
+INTEGER_DTYPE = np.int64
+
+CONDITION_FIELDS = ('traffic_load', 'weather', 'soil_type')
+
+# Properties averaged into the property term of calculate_material_score
+SCORED_PROPERTIES = ('durability', 'weather_resistance', 'load_capacity')
+
+# Dimensions where an 'all' entry in suitable_conditions matches any value.
+# Traffic load is matched literally, exactly as in calculate_material_score.
+WILDCARD_FIELDS = ('weather', 'soil_type')
+WILDCARD = 'all'
+
+KNOWN_VALUES = {
+    'traffic_load': TRAFFIC_LOADS,
+    'weather': WEATHER_CONDITIONS,
+    'soil_type': SOIL_TYPES
+}
+
+MAX_CONDITION_VALUES = 64  # One bit per value in a uint64 mask
+
+# Upper bound on (params x materials) cells held in temporaries while batch scoring
+BATCH_CHUNK_ELEMENTS = 1 << 22
+
+# Rows kept per answer table entry; deeper requests are scored directly
+ANSWER_TABLE_DEPTH = 10_000
+
+# A dict catalog is re-hashed to catch in-place edits at most once per poll interval,
+# stretched so hashing a large catalog takes at most this share of the time
+CATALOG_POLL_INTERVAL = 2.0
+CATALOG_HASH_SHARE = 0.01
+
+
+def content_version(materials_database: Dict[str, Dict[str, Any]]) -> str:
+    """Hash of a materials database's contents, so in-place edits give a new version."""
+    data = pickle.dumps(materials_database, protocol=pickle.HIGHEST_PROTOCOL)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _is_integer(value: Any) -> bool:
+    return isinstance(value, Integral) and not isinstance(value, bool)
+
+
+class CompiledCatalog:
+    """Columnar form of a materials database: property matrix plus per-dimension condition bitmasks.
+
+    `version` identifies the contents the catalog was compiled from.
+    """
+
+    def __init__(self, materials_database: Dict[str, Dict[str, Any]], version: Optional[str] = None):
+        self.version = version or content_version(materials_database)
+        self.names: List[str] = list(materials_database)
+        entries = list(materials_database.values())
+
+        self.properties = np.array(
+            [[entry['properties'][field] for field in PROPERTY_FIELDS] for entry in entries],
+            dtype=np.float64
+        ).reshape(len(entries), len(PROPERTY_FIELDS))
+        self.integer_fields = tuple(
+            field for field in PROPERTY_FIELDS
+            if all(_is_integer(entry['properties'][field]) for entry in entries)
+        )
+
+        # Property term is independent of the request, so it is computed once here
+        scored_columns = [PROPERTY_FIELDS.index(field) for field in SCORED_PROPERTIES]
+        self.property_score = self.properties[:, scored_columns].mean(axis=1) * 10
+
+        self.vocabularies: Dict[str, Dict[str, int]] = {}
+        self.condition_masks: Dict[str, np.ndarray] = {}
+        for field in CONDITION_FIELDS:
+            vocabulary = {value: code for code, value in enumerate(KNOWN_VALUES[field])}
+            vocabulary.setdefault(WILDCARD, len(vocabulary))
+            masks = np.zeros(len(entries), dtype=np.uint64)
+            for row, entry in enumerate(entries):
+                bits = 0
+                for value in entry['suitable_conditions'][field]:
+                    if value not in vocabulary:
+                        if len(vocabulary) == MAX_CONDITION_VALUES:
+                            raise ValueError(
+                                f"Too many distinct '{field}' values; "
+                                f"at most {MAX_CONDITION_VALUES} are supported"
+                            )
+                        vocabulary[value] = len(vocabulary)
+                    bits |= 1 << vocabulary[value]
+                masks[row] = bits
+            self.vocabularies[field] = vocabulary
+            self.condition_masks[field] = masks
+
+        # Names and advantages share one string pool; advantages are id runs delimited by offsets
+        strings = StringPool()
+        self.name_ids = np.array([strings.add(name) for name in self.names], dtype=np.uint32)
+        advantage_ids: List[int] = []
+        advantage_offsets = [0]
+        for entry in entries:
+            advantage_ids.extend(strings.add(advantage) for advantage in entry['advantages'])
+            advantage_offsets.append(len(advantage_ids))
+        self.advantage_ids = np.array(advantage_ids, dtype=np.uint32)
+        self.advantage_offsets = np.array(advantage_offsets, dtype=np.uint64)
+        self.string_offsets, self.string_data = strings.arrays()
+        self._init_views()
+
+    def _init_views(self) -> None:
+        """Set up the record array and entry views once the columns are in place."""
+        self.records = self.properties.view(PROPERTY_DTYPE).reshape(-1)
+        self.record_dtype = np.dtype([
+            (field, INTEGER_DTYPE if field in self.integer_fields else np.float64) for field in PROPERTY_FIELDS
+        ])
+        self.condition_values = {
+            field: sorted(vocabulary, key=vocabulary.get) for field, vocabulary in self.vocabularies.items()
+        }
+        self.entries = MaterialEntries(self)
+
+    def property_records(self, rows) -> np.ndarray:
+        """Property records of the given rows, with integer fields as integers."""
+        return self.records[rows].astype(self.record_dtype)
+
+    def string(self, string_id: int) -> str:
+        start, end = self.string_offsets[string_id], self.string_offsets[string_id + 1]
+        return bytes(self.string_data[start:end]).decode('utf-8')
+
+    def advantages(self, index: int) -> List[str]:
+        start, end = self.advantage_offsets[index], self.advantage_offsets[index + 1]
+        return [self.string(string_id) for string_id in self.advantage_ids[start:end]]
+
+    def suitable_conditions(self, index: int) -> Dict[str, List[str]]:
+        """Condition values of one material, decoded from its bitmasks."""
+        conditions = {}
+        for field in CONDITION_FIELDS:
+            bits = int(self.condition_masks[field][index])
+            conditions[field] = [value for code, value in enumerate(self.condition_values[field]) if bits >> code & 1]
+        return conditions
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the catalog's arrays (names list excluded)."""
+        arrays = [
+            self.properties, self.property_score, self.name_ids, self.advantage_ids,
+            self.advantage_offsets, self.string_offsets, self.string_data
+        ] + list(self.condition_masks.values())
+        return sum(array.nbytes for array in arrays)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def query_bits(self, field: str, value: str) -> int:
+        """Bitmask of catalog condition values that satisfy a requested value."""
+        vocabulary = self.vocabularies[field]
+        bits = 1 << vocabulary[value] if value in vocabulary else 0
+        if field in WILDCARD_FIELDS:
+            bits |= 1 << vocabulary[WILDCARD]
+        return bits
+
+    def condition_matches(self, field: str, value: str) -> np.ndarray:
+        """Boolean vector of materials compatible with one condition value."""
+        return (self.condition_masks[field] & np.uint64(self.query_bits(field, value))) != 0
+
+    def score(
+        self,
+        params: Dict[str, Any],
+        weight_factors: Dict[str, float],
+        rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Vectorized calculate_material_score over the catalog, or over the given rows only."""
+        select = slice(None) if rows is None else rows
+        # Terms are accumulated in the same order as the scalar function so scores match exactly
+        score = np.zeros(len(self.property_score[select]), dtype=np.float64)
+        for field in CONDITION_FIELDS:
+            bits = np.uint64(self.query_bits(field, params[field]))
+            matches = (self.condition_masks[field][select] & bits) != 0
+            score += np.where(matches, 100 * weight_factors[field], 0.0)
+        score += self.property_score[select] * weight_factors['durability']
+        return score
+
+    def encode_params(self, params_list: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Encode parameter sets as a (params x condition fields) array of query bitmasks."""
+        encoded = np.zeros((len(params_list), len(CONDITION_FIELDS)), dtype=np.uint64)
+        for column, field in enumerate(CONDITION_FIELDS):
+            bits_by_value: Dict[str, int] = {}
+            for row, params in enumerate(params_list):
+                value = params[field]
+                if value not in bits_by_value:
+                    bits_by_value[value] = self.query_bits(field, value)
+                encoded[row, column] = bits_by_value[value]
+        return encoded
+
+    def score_encoded(self, encoded: np.ndarray, weight_factors: Dict[str, float]) -> np.ndarray:
+        """Score every material for each encoded parameter set, returning a (params x materials) grid."""
+        rows = len(encoded)
+        scores = np.empty((rows, len(self.names)), dtype=np.float64)
+        property_term = self.property_score * weight_factors['durability']
+        chunk = max(1, BATCH_CHUNK_ELEMENTS // max(1, len(self.names)))
+        for start in range(0, rows, chunk):
+            block = encoded[start:start + chunk]
+            block_scores = np.zeros((len(block), len(self.names)), dtype=np.float64)
+            for column, field in enumerate(CONDITION_FIELDS):
+                matches = (self.condition_masks[field][None, :] & block[:, column, None]) != 0
+                block_scores += np.where(matches, 100 * weight_factors[field], 0.0)
+            block_scores += property_term
+            scores[start:start + chunk] = block_scores
+        return scores
+
+
+def rank_scores(scores: np.ndarray) -> np.ndarray:
+    """Indices ordering scores best first; equal scores keep catalog order."""
+    ranking = np.argsort(-scores, kind='stable')
+    return ranking.astype(np.int32) if len(scores) < np.iinfo(np.int32).max else ranking
+
+
+def top_k_indices(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """Indices of the k best scores, in the same order as the first k of rank_scores().
+
+    Uses argpartition so only the selected indices are sorted. Materials tied with
+    the k-th score are taken in catalog order, which keeps the result deterministic.
+    """
+    if k is None or k >= len(scores):
+        return rank_scores(scores)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    partitioned = np.argpartition(-scores, k - 1)[:k]
+    threshold = scores[partitioned].min()
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[:k - len(above)]
+    selected = np.concatenate([above, tied])
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+
+class AnswerTable:
+    """The best material indices and scores for every combination of known condition values.
+
+    `location` does not affect scoring, so the known traffic, weather and soil values
+    span a small finite input space. Each entry keeps the top `depth` rows of its
+    ranking. Entries are filled on first lookup, or all at once with build().
+    Parameter sets outside the known values are not cached, and neither are
+    rankings deeper than `depth`.
+    """
+
+    def __init__(self, catalog: CompiledCatalog, weight_factors: Dict[str, float], depth: int = ANSWER_TABLE_DEPTH):
+        self.catalog = catalog
+        self.weight_factors = dict(weight_factors)
+        self.depth = depth
+        self.entries: Dict[Tuple[str, ...], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def is_current(self, catalog: CompiledCatalog, weight_factors: Dict[str, float]) -> bool:
+        """Whether the table was built from the same catalog contents and weights."""
+        return self.catalog.version == catalog.version and self.weight_factors == weight_factors
+
+    def covers(self, top_k: Optional[int]) -> bool:
+        """Whether entries are deep enough to answer a request for top_k rows (None for all)."""
+        if self.depth >= len(self.catalog):
+            return True
+        return top_k is not None and top_k <= self.depth
+
+    def _entry(self, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        ranking = top_k_indices(scores, self.depth)
+        return ranking, scores[ranking]
+
+    def lookup(self, params: Dict[str, Any], top_k: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Return (ranking, ranked scores) of the top_k best materials, or None if the table cannot answer."""
+        key = tuple(params[field] for field in CONDITION_FIELDS)
+        if not self.covers(top_k):
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            if not all(value in KNOWN_VALUES[field] for field, value in zip(CONDITION_FIELDS, key)):
+                return None
+            entry = self.entries[key] = self._entry(self.catalog.score(params, self.weight_factors))
+        return entry[0][:top_k], entry[1][:top_k]
+
+    def build(self) -> 'AnswerTable':
+        """Fill every combination not yet in the table, scoring them in batches."""
+        missing = [
+            key for key in product(*(KNOWN_VALUES[field] for field in CONDITION_FIELDS))
+            if key not in self.entries
+        ]
+        chunk = max(1, BATCH_CHUNK_ELEMENTS // max(1, len(self.catalog)))
+        for start in range(0, len(missing), chunk):
+            keys = missing[start:start + chunk]
+            params_list = [dict(zip(CONDITION_FIELDS, key)) for key in keys]
+            scores = self.catalog.score_encoded(self.catalog.encode_params(params_list), self.weight_factors)
+            for key, row in zip(keys, scores):
+                self.entries[key] = self._entry(row)
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ranking.nbytes + scores.nbytes for ranking, scores in self.entries.values())
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class IncrementalScorer:
+    """Scores one catalog for a sequence of parameter sets that usually differ in one field.
+
+    calculate_material_score is a condition sum plus a property term. Each material's
+    condition sum depends only on which fields it matches, a 3-bit pattern, so a score
+    is its pattern's sum plus the property term, which is computed once. Match bits are
+    cached per (field, value); when a field changes, only that field's bit is swapped in
+    the pattern vector. Scores equal CompiledCatalog.score exactly, because each
+    pattern's sum is accumulated in the same order.
+
+    Within a pattern materials rank by property term, so top_k() reads each pattern's
+    best rows off a presorted property order instead of scoring the whole catalog.
+    """
+
+    # Share of the property order scanned for a pattern's best rows before collecting them directly
+    SCAN_SHARE = 1 / 64
+
+    def __init__(self, catalog: CompiledCatalog, weight_factors: Dict[str, float]):
+        self.catalog = catalog
+        self.weight_factors = dict(weight_factors)
+        self.property_term = catalog.property_score * weight_factors['durability']
+        # Best property term first; equal terms keep catalog order, as in rank_scores
+        self.property_order = rank_scores(self.property_term)
+        self.values: Dict[str, Any] = {}
+        self.pattern: Optional[np.ndarray] = None
+        self.last_changed: Tuple[str, ...] = ()
+        self._bits: Dict[Tuple[str, Any], np.ndarray] = {}
+        self._scores: Optional[np.ndarray] = None
+
+        # Condition sum for every match pattern, bit i standing for CONDITION_FIELDS[i]
+        self.pattern_sums = np.zeros(1 << len(CONDITION_FIELDS), dtype=np.float64)
+        for pattern in range(len(self.pattern_sums)):
+            total = 0.0
+            for position, field in enumerate(CONDITION_FIELDS):
+                total += 100 * weight_factors[field] if pattern >> position & 1 else 0.0
+            self.pattern_sums[pattern] = total
+
+    def is_current(self, catalog: CompiledCatalog, weight_factors: Dict[str, float]) -> bool:
+        return self.catalog.version == catalog.version and self.weight_factors == weight_factors
+
+    def _field_bits(self, field: str, value: Any) -> np.ndarray:
+        key = (field, value)
+        bits = self._bits.get(key)
+        if bits is None:
+            position = CONDITION_FIELDS.index(field)
+            bits = self._bits[key] = self.catalog.condition_matches(field, value).astype(np.uint8) << position
+        return bits
+
+    def update(self, params: Dict[str, Any]) -> Tuple[str, ...]:
+        """Bring the pattern vector up to date with params and return the fields that changed."""
+        changed = tuple(
+            field for field in CONDITION_FIELDS if field not in self.values or self.values[field] != params[field]
+        )
+        self.last_changed = changed
+        if not changed:
+            return changed
+        if self.pattern is None or len(changed) == len(CONDITION_FIELDS):
+            self.pattern = np.zeros(len(self.catalog), dtype=np.uint8)
+            for field in CONDITION_FIELDS:
+                self.pattern |= self._field_bits(field, params[field])
+        else:
+            for field in changed:
+                # Each field owns one bit, so its old bits are cleared and the new ones set in place
+                self.pattern &= np.uint8(~(1 << CONDITION_FIELDS.index(field)) & 0xFF)
+                self.pattern |= self._field_bits(field, params[field])
+        self.values = {field: params[field] for field in CONDITION_FIELDS}
+        self._scores = None
+        return changed
+
+    def _current_scores(self) -> np.ndarray:
+        if self._scores is None:
+            self._scores = self.pattern_sums[self.pattern] + self.property_term
+        return self._scores
+
+    def score(self, params: Dict[str, Any]) -> np.ndarray:
+        """Score vector for params, equal to CompiledCatalog.score."""
+        self.update(params)
+        return self._current_scores()
+
+    def _pattern_best(self, pattern: int, k: int) -> np.ndarray:
+        """The k best rows with a given pattern (fewer if it has fewer members), in ranking order."""
+        found: List[np.ndarray] = []
+        needed = k
+        start, block = 0, max(1024, 4 * k)
+        scan_limit = max(block, int(self.SCAN_SHARE * len(self.catalog)))
+        while needed > 0 and start < scan_limit:
+            rows = self.property_order[start:start + block]
+            selected = rows[self.pattern[rows] == pattern][:needed]
+            found.append(selected)
+            needed -= len(selected)
+            start += block
+            block *= 2
+        if needed <= 0 or start >= len(self.catalog):
+            return np.concatenate(found)
+        # A rare pattern: collect its members directly instead of scanning the whole order
+        rows = np.flatnonzero(self.pattern == pattern)
+        return rows[top_k_indices(self.property_term[rows], k)]
+
+    def top_k(self, params: Dict[str, Any], k: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(ranking, ranked scores) of the k best materials, as top_k_indices would give them."""
+        self.update(params)
+        if k is None or k >= len(self.catalog) or self._scores is not None:
+            scores = self._current_scores()
+            ranking = top_k_indices(scores, k)
+            return ranking, scores[ranking]
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+        best_property = self.property_term[self.property_order[0]]
+        candidates: List[np.ndarray] = []
+        floor = -np.inf
+        for pattern in np.argsort(-self.pattern_sums, kind='stable'):
+            # Skip patterns that cannot reach the current k-th score; ties are kept for catalog order
+            if self.pattern_sums[pattern] + best_property < floor:
+                continue
+            candidates.append(self._pattern_best(int(pattern), k))
+            rows = np.concatenate(candidates)
+            if len(rows) >= k:
+                floor = np.partition(self.pattern_sums[self.pattern[rows]] + self.property_term[rows], -k)[-k]
+
+        rows = np.sort(np.concatenate(candidates))
+        scores = self.pattern_sums[self.pattern[rows]] + self.property_term[rows]
+        selected = top_k_indices(scores, k)
+        return rows[selected], scores[selected]
+
+
+_compiled_cache: Dict[str, Any] = {'catalog': None, 'source': None, 'checked_at': 0.0, 'interval': 0.0}
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_catalog(materials_database: Dict[str, Dict[str, Any]]) -> CompiledCatalog:
+    """Return the compiled form of a catalog, compiling only when its contents have changed.
+
+    A different dict or a change in length is noticed on every call. In-place edits
+    are noticed by re-hashing the contents, which happens at most once per
+    CATALOG_POLL_INTERVAL; call invalidate_compiled_catalog() to apply them at once.
+    """
+    catalog = _compiled_cache['catalog']
+    now = time.monotonic()
+    if (
+        catalog is not None
+        and _compiled_cache['source'] == (id(materials_database), len(materials_database))
+        and now - _compiled_cache['checked_at'] < _compiled_cache['interval']
+    ):
+        return catalog
+    with _compiled_lock:
+        started = time.perf_counter()
+        version = content_version(materials_database)
+        elapsed = time.perf_counter() - started
+        catalog = _compiled_cache['catalog']
+        if catalog is None or catalog.version != version:
+            catalog = _compiled_cache['catalog'] = CompiledCatalog(materials_database, version=version)
+        _compiled_cache.update(
+            source=(id(materials_database), len(materials_database)),
+            checked_at=now,
+            interval=max(CATALOG_POLL_INTERVAL, elapsed / CATALOG_HASH_SHARE)
+        )
+    return catalog
+
+
+def invalidate_compiled_catalog() -> None:
+    """Drop the compiled catalog, e.g. after editing material entries in place; the next call recompiles it."""
+    with _compiled_lock:
+        _compiled_cache.update(catalog=None, source=None, checked_at=0.0, interval=0.0)
@@ -0,0 +1,188 @@
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from utils.advanced_calculations import COMPREHENSIVE_WEIGHTS, get_comprehensive_scores_batch
+from utils.recommendation_engine import WEIGHT_FACTORS, _check_scoring, get_active_catalog
+from utils.scoring_engine import CONDITION_FIELDS, CompiledCatalog, top_k_indices
+
+# Upper bound on (samples x distinct materials) cells scored per chunk
+SAMPLE_CHUNK_ELEMENTS = 1 << 22
+SAMPLE_CHUNK_WIDTH = 256
+
+COMPREHENSIVE_FEATURES = {
+    'load_capacity': 'load_capacity_score',
+    'cost_efficiency': 'cost_efficiency_score',
+    'environmental_impact': 'environmental_score',
+    'weather_resistance': 'weather_resistance_score'
+}
+
+
+def score_features(catalog: CompiledCatalog, params: Dict[str, Any], scoring: str):
+    """Per-material feature matrix and default weights, so that score = features @ weights."""
+    if scoring == 'comprehensive':
+        metrics = get_comprehensive_scores_batch([params], catalog)
+        names = list(COMPREHENSIVE_WEIGHTS)
+        features = np.column_stack([metrics[COMPREHENSIVE_FEATURES[name]][0] for name in names])
+        return features, np.array([COMPREHENSIVE_WEIGHTS[name] for name in names]), names
+
+    names = list(CONDITION_FIELDS) + ['durability']
+    columns = [
+        np.where((catalog.condition_masks[field] & np.uint64(catalog.query_bits(field, params[field]))) != 0, 100.0, 0.0)
+        for field in CONDITION_FIELDS
+    ]
+    features = np.column_stack(columns + [catalog.property_score])
+    return features, np.array([WEIGHT_FACTORS[name] for name in names]), names
+
+
+def _maximal_rows(rows: np.ndarray, block: int = 4096) -> np.ndarray:
+    """Indices of distinct rows not dominated by any other row; only these can score highest."""
+    order = np.argsort(-rows.sum(axis=1), kind='stable')
+    front = np.empty(0, dtype=np.int64)
+    for start in range(0, len(order), block):
+        candidates = order[start:start + block]
+        # A dominating row has a strictly larger sum, so it is in the front or earlier in this block
+        if len(front):
+            beaten = (rows[front][None, :, :] >= rows[candidates][:, None, :]).all(axis=2).any(axis=1)
+            candidates = candidates[~beaten]
+        covers = (rows[candidates][None, :, :] >= rows[candidates][:, None, :]).all(axis=2)
+        np.fill_diagonal(covers, False)
+        front = np.concatenate([front, candidates[~covers.any(axis=1)]])
+    return np.sort(front)
+
+
+def _wilson_interval(successes: int, trials: int, z: float = 1.96):
+    if not trials:
+        return 0.0, 0.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denominator
+    margin = z * np.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def _histogram_quantile(histogram: np.ndarray, q: float) -> int:
+    cumulative = np.cumsum(histogram)
+    return int(np.searchsorted(cumulative, q * cumulative[-1]))
+
+
+def weight_sensitivity(
+    params: Dict[str, Any],
+    scoring: str = 'suitability',
+    samples: int = 100_000,
+    concentration: float = 100.0,
+    contenders: int = 10,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Monte Carlo stability of the ranking under perturbed weights.
+
+    Weight vectors are drawn from a Dirichlet distribution centred on the default
+    weights; `concentration` controls the spread (larger = closer to the defaults).
+    Materials with identical feature rows always score the same, so they are
+    scored once per distinct row, and dominance prunes the rows each sample has
+    to score, which keeps large catalogs within seconds.
+    Rank statistics are collected for the `contenders` best materials under the
+    default weights; first-place probabilities cover the whole catalog.
+    """
+    _check_scoring(scoring)
+    catalog = get_active_catalog()
+    features, default_weights, weight_names = score_features(catalog, params, scoring)
+    total_weight = default_weights.sum()
+    count = len(catalog)
+    if not count:
+        return {'samples': 0, 'scoring': scoring, 'weights': weight_names, 'materials': []}
+
+    # Distinct feature rows, ordered by their first material so argmax ties go to catalog order
+    rows, first_index, inverse, group_sizes = np.unique(
+        features, axis=0, return_index=True, return_inverse=True, return_counts=True
+    )
+    order = np.argsort(first_index)
+    rows, first_index, group_sizes = rows[order], first_index[order], group_sizes[order]
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    group = remap[inverse.reshape(-1)]
+
+    # Members of a group always tie; the lower catalog index ranks first among them
+    by_group = np.lexsort((np.arange(count), group))
+    position_in_group = np.empty(count, dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(np.bincount(group, minlength=len(rows)))[:-1]])
+    position_in_group[by_group] = np.arange(count) - starts[group[by_group]]
+
+    default_ranking = top_k_indices(features @ default_weights, count)
+    default_rank = np.empty(count, dtype=np.int64)
+    default_rank[default_ranking] = np.arange(1, count + 1)
+    tracked = default_ranking[:min(contenders, count)]
+    tracked_groups = group[tracked]
+
+    # With strictly positive weights a dominated row never scores highest, a dominating row
+    # always outscores and a dominated row never does, so only incomparable rows need sampling
+    front = _maximal_rows(rows)
+    comparisons = []
+    for material_group in tracked_groups:
+        target = rows[material_group]
+        above = (rows >= target).all(axis=1)
+        below = (rows <= target).all(axis=1)
+        above[material_group] = False  # a row never outscores itself
+        contested = np.flatnonzero(~(above | below))
+        comparisons.append((rows[contested] - target, group_sizes[contested], int(group_sizes[above].sum())))
+
+    rng = np.random.default_rng(seed)
+    alpha = concentration * default_weights / total_weight
+    first_counts = np.zeros(len(rows), dtype=np.int64)
+    rank_histograms = np.zeros((len(tracked), count + 1), dtype=np.int64)
+    rank_sums = np.zeros(len(tracked), dtype=np.float64)
+
+    chunk = max(1, SAMPLE_CHUNK_ELEMENTS // max(len(front), SAMPLE_CHUNK_WIDTH))
+    for start in range(0, samples, chunk):
+        size = min(chunk, samples - start)
+        weights = rng.dirichlet(alpha, size=size) * total_weight
+        first_counts += np.bincount(front[np.argmax(weights @ rows[front].T, axis=1)], minlength=len(rows))
+
+        # Bound each contested row's score margin over the box spanned by this chunk's weights
+        low_weights, high_weights = weights.min(axis=0), weights.max(axis=0)
+        for slot, material in enumerate(tracked):
+            margins, sizes, always_above = comparisons[slot]
+            lowest = np.minimum(margins * low_weights, margins * high_weights).sum(axis=1)
+            highest = np.maximum(margins * low_weights, margins * high_weights).sum(axis=1)
+            ranks = np.full(size, 1 + always_above + position_in_group[material] + int(sizes[lowest > 0].sum()))
+            undecided = np.flatnonzero((highest > 0) & (lowest <= 0))
+            for part in range(0, len(undecided), SAMPLE_CHUNK_WIDTH):
+                selected = undecided[part:part + SAMPLE_CHUNK_WIDTH]
+                ranks += (weights @ margins[selected].T > 0) @ sizes[selected]
+            rank_histograms[slot] += np.bincount(ranks, minlength=count + 1)[:count + 1]
+            rank_sums[slot] += ranks.sum()
+
+    first_place = np.zeros(count, dtype=np.int64)
+    first_place[first_index] = first_counts
+
+    results: Dict[int, Dict[str, Any]] = {}
+    for slot, material in enumerate(tracked):
+        histogram = rank_histograms[slot]
+        results[int(material)] = {
+            'mean_rank': float(rank_sums[slot] / samples),
+            'rank_p05': _histogram_quantile(histogram, 0.05),
+            'rank_median': _histogram_quantile(histogram, 0.5),
+            'rank_p95': _histogram_quantile(histogram, 0.95)
+        }
+    for material in np.flatnonzero(first_place):
+        results.setdefault(int(material), {'mean_rank': None, 'rank_p05': None, 'rank_median': None, 'rank_p95': None})
+
+    materials: List[Dict[str, Any]] = []
+    for material, stats in results.items():
+        low, high = _wilson_interval(int(first_place[material]), samples)
+        materials.append({
+            'material': catalog.names[material],
+            'default_rank': int(default_rank[material]),
+            'p_first': float(first_place[material] / samples),
+            'p_first_low': float(low),
+            'p_first_high': float(high),
+            **stats
+        })
+    materials.sort(key=lambda row: (-row['p_first'], row['default_rank']))
+
+    return {
+        'samples': samples,
+        'scoring': scoring,
+        'concentration': concentration,
+        'weights': weight_names,
+        'materials': materials
+    }
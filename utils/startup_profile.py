@@ -0,0 +1,102 @@
+"""Startup timing for the Streamlit app.
+
+Set STARTUP_PROFILE=1 to record how long deferred imports and the first form
+render take; main.py then shows the numbers in the sidebar. STARTUP_BUDGET_MS
+sets the first-render budget (default 1500 ms). Cold import cost per module,
+measured in fresh interpreters, is available with:
+
+    python -m utils.startup_profile [--budget-ms 1500]
+"""
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+ENABLED = os.environ.get('STARTUP_PROFILE', '') not in ('', '0')
+BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 1500))
+
+# Modules on the path to the first form paint, and those deferred until results are shown
+FORM_MODULES = ['streamlit', 'data.materials_database']
+DEFERRED_MODULES = ['numpy', 'pandas', 'plotly.graph_objects', 'plotly.express', 'utils.recommendation_engine']
+
+_run_start = time.perf_counter()
+_imports: Dict[str, float] = {}
+_marks: Dict[str, float] = {}
+
+
+def begin_run() -> None:
+    """Start timing a script run; marks are measured from here."""
+    global _run_start
+    _run_start = time.perf_counter()
+    _marks.clear()
+
+
+@contextmanager
+def timed_import(label: str):
+    """Time the first execution of an import block; later runs are cached by Python and skipped."""
+    if not ENABLED or label in _imports:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _imports[label] = (time.perf_counter() - start) * 1000
+
+
+def mark(label: str) -> None:
+    """Record the time elapsed since the start of the current run."""
+    if ENABLED:
+        _marks[label] = (time.perf_counter() - _run_start) * 1000
+
+
+def report() -> List[Dict[str, object]]:
+    """Rows of (stage, milliseconds) for the imports and marks recorded so far."""
+    rows = [{'stage': f'import {label}', 'ms': round(ms, 1)} for label, ms in _imports.items()]
+    rows += [{'stage': label, 'ms': round(ms, 1)} for label, ms in _marks.items()]
+    return rows
+
+
+def over_budget(label: str, budget_ms: Optional[float] = None) -> bool:
+    """Whether a recorded mark exceeded the startup budget."""
+    budget_ms = BUDGET_MS if budget_ms is None else budget_ms
+    return _marks.get(label, 0.0) > budget_ms
+
+
+def measure_cold_import(module: str) -> float:
+    """Import a module in a fresh interpreter and return the time it took in milliseconds."""
+    code = (
+        'import time; start = time.perf_counter(); '
+        f'import {module}; '
+        'print((time.perf_counter() - start) * 1000)'
+    )
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure cold import time of the app modules.')
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS,
+                        help='fail when the imports needed for the form exceed this budget')
+    args = parser.parse_args(argv)
+
+    form_total = 0.0
+    for group, modules in (('form', FORM_MODULES), ('deferred', DEFERRED_MODULES)):
+        for module in modules:
+            ms = measure_cold_import(module)
+            if group == 'form':
+                form_total += ms
+            print(f'{group:<9} {module:<32} {ms:8.1f} ms')
+    print(f'form path total {form_total:.1f} ms (budget {args.budget_ms:.0f} ms)')
+    return 1 if form_total > args.budget_ms else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())